@@ -1,587 +1,358 @@
-from flask import Flask, request, jsonify, render_template
-from collections import OrderedDict, deque
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from cache import GrammarCache
+from compiler import compile_grammar, LR_METHODS
+from parsers import parse_string_slr, parse_string_ll1, parse_string_glr, expected_after
+from batch import parse_batch
+from stream import parse_stream, read_chunks
+from metrics import record_build, record_parse, render_metrics
+from jobs import JobManager
+import json
+import os
+import re
+import time
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}})
 
-t_list = OrderedDict()
-nt_list = OrderedDict()
-production_list = []
-
-class Terminal:
-    def __init__(self, symbol):
-        self.symbol = symbol
-    def __str__(self):
-        return self.symbol
-
-class NonTerminal:
-    def __init__(self, symbol):
-        self.symbol = symbol
-        self.first = set()
-        self.follow = set()
-    def __str__(self):
-        return self.symbol
-    def add_first(self, symbols):
-        self.first |= set(symbols)
-    def add_follow(self, symbols):
-        self.follow |= set(symbols)
-
-class Item(str):
-    def __new__(cls, item, lookahead=list()):
-        obj = str.__new__(cls, item)
-        obj.lookahead = lookahead
-        return obj
-    def __str__(self):
-        return super(Item, self).__str__() + ", " + '|'.join(self.lookahead)
-
-def compute_first(symbol):
-    global production_list, nt_list, t_list
-    if symbol in t_list:
-        return set(symbol)
-
-    for prod in production_list:
-        head, body = prod.split('->')
-        if head != symbol:
-            continue
-        if body == '':
-            nt_list[symbol].add_first('ϵ')
-            continue
-        for i, Y in enumerate(body):
-            if Y == symbol:
-                continue
-            t = compute_first(Y)
-            nt_list[symbol].add_first(t - {'ϵ'})
-            if 'ϵ' not in t:
-                break
-            if i == len(body) - 1:
-                nt_list[symbol].add_first('ϵ')
-
-    return nt_list[symbol].first
-
-def get_first(symbol):
-    return compute_first(symbol)
-
-def compute_follow(symbol):
-    global production_list, nt_list
-    if symbol == list(nt_list.keys())[0]:
-        nt_list[symbol].add_follow('$')
-
-    for prod in production_list:
-        head, body = prod.split('->')
-        for i, B in enumerate(body):
-            if B != symbol:
-                continue
-            if i != len(body) - 1:
-                next_symbol = body[i + 1]
-                nt_list[symbol].add_follow(get_first(next_symbol) - {'ϵ'})
-            if i == len(body) - 1 or ('ϵ' in get_first(body[i + 1]) and B != head):
-                nt_list[symbol].add_follow(get_follow(head))
-
-def get_follow(symbol):
-    if symbol in t_list:
-        return None
-    return nt_list[symbol].follow
-
-def reset_globals():
-    global t_list, nt_list, production_list
-    t_list = OrderedDict()
-    nt_list = OrderedDict()
-    production_list = []
-
-def closure(items):
-    def exists(newitem, items):
-        for i in items:
-            if i == newitem and sorted(set(i.lookahead)) == sorted(set(newitem.lookahead)):
-                return True
-        return False
-
-    global production_list
-
-    while True:
-        flag = 0
-        for i in items:
-            if i.index('.') == len(i) - 1: 
-                continue
-
-            Y = i.split('->')[1].split('.')[1][0]
-
-            if i.index('.') + 1 < len(i) - 1:
-                lastr = list(compute_first(i[i.index('.') + 2]) - set(['ϵ']))
-            else:
-                lastr = i.lookahead
-
-            for prod in production_list:
-                head, body = prod.split('->')
-                if head != Y: 
-                    continue
-
-                newitem = Item(Y + '->.' + body, lastr)
-                if not exists(newitem, items):
-                    items.append(newitem)
-                    flag = 1
-        if flag == 0:
-            break
-    return items
-
-def goto(items, symbol):
-    global production_list
-    initial = []
-
-    for i in items:
-        if i.index('.') == len(i) - 1: 
-            continue
-
-        head, body = i.split('->')
-        seen, unseen = body.split('.')
-
-        if unseen[0] == symbol and len(unseen) >= 1:
-            initial.append(Item(head + '->' + seen + unseen[0] + '.' + unseen[1:], i.lookahead))
-
-    return closure(initial)
-
-def calc_states():
-    def contains(states, t):
-        for s in states:
-            if len(s) != len(t): 
-                continue
-            if sorted(s) == sorted(t):
-                for i in range(len(s)):
-                    if s[i].lookahead != t[i].lookahead:
-                        break
-                else:
-                    return True
-        return False
-
-    global production_list
-
-    head, body = production_list[0].split('->')
-    states = [closure([Item(head + '->.' + body, ['$'])])]
-
-    while True:
-        flag = 0
-        for s in states:
-            for e in list(nt_list.keys()) + list(t_list.keys()):
-                t = goto(s, e)
-                if t == [] or contains(states, t):
-                    continue
-                states.append(t)
-                flag = 1
-        if not flag:
-            break
-
-    return states
-
-def augment_grammar():
-    global production_list, nt_list
-    for i in range(ord('Z'), ord('A') - 1, -1):
-        if chr(i) not in nt_list:
-            start_prod = production_list[0]
-            production_list.insert(0, chr(i) + '->' + start_prod.split('->')[0])
-            return
-
-def build_parsing_table(states):
-    table = []
-    symbols = list(t_list.keys()) + list(nt_list.keys()) + ['$']
-    state_map = {tuple(sorted(str(item) for item in s)): idx for idx, s in enumerate(states)}
-
-    for idx, state in enumerate(states):
-        row = {sym: '' for sym in symbols}
-        for item in state:
-            if item.index('.') == len(item) - 1:
-                head, body = item.split('->')
-                body = body.replace('.', '')
-                if head == production_list[0].split('->')[0] and body == production_list[1].split('->')[0]:
-                    row['$'] = 'Accept'
-                else:
-                    prod_no = production_list.index(f"{head}->{body}")
-                    for la in item.lookahead:
-                        row[la] = f"r{prod_no}"
-            else:
-                after_dot = item.split('->')[1].split('.')[1]
-                next_symbol = after_dot[0]
-                next_state = goto(state, next_symbol)
-                for k, v in state_map.items():
-                    if sorted(k) == sorted(str(x) for x in next_state):
-                        if next_symbol in t_list:
-                            row[next_symbol] = f"s{v}"
-                        elif next_symbol in nt_list:
-                            row[next_symbol] = str(v)
-        table.append(row)
-    return table
-
-def parse_string_slr(input_string, parsing_table):
-    stack = ['0']
-    input_string = input_string + '$'
-    parse_steps = []
-    
-    parse_steps.append({
-        'stack': ' '.join(stack),
-        'input': input_string,
-        'action': 'Initial'
-    })
-    
-    while True:
-        current_state = int(stack[-1])
-        current_symbol = input_string[0]
-        
-        if current_symbol not in parsing_table[current_state]:
-            return {
-                'success': False,
-                'message': f"Invalid symbol '{current_symbol}' in state {current_state}",
-                'steps': parse_steps
-            }
-        
-        action = parsing_table[current_state][current_symbol]
-        
-        if action == '':
-            return {
-                'success': False,
-                'message': f"No action for symbol '{current_symbol}' in state {current_state}",
-                'steps': parse_steps
-            }
-        
-        if action == 'Accept':
-            parse_steps.append({
-                'stack': ' '.join(stack),
-                'input': input_string,
-                'action': 'Accept'
-            })
-            return {
-                'success': True,
-                'message': 'String accepted!',
-                'steps': parse_steps
-            }
-        
-        elif action.startswith('s'):  # Shift
-            next_state = action[1:]
-            stack.append(current_symbol)
-            stack.append(next_state)
-            input_string = input_string[1:]
-            
-            parse_steps.append({
-                'stack': ' '.join(stack),
-                'input': input_string,
-                'action': f"Shift to state {next_state}"
-            })
-            
-        elif action.startswith('r'):  # Reduce
-            prod_num = int(action[1:])
-            production = production_list[prod_num]
-            head, body = production.split('->')
-            
-            if body == '':  # Handling epsilon productions
-                parse_steps.append({
-                    'stack': ' '.join(stack),
-                    'input': input_string,
-                    'action': f"Reduce by {production} (epsilon)"
-                })
-                stack.append(head)
-                # Need to find the goto for the new state
-                current_state = int(stack[-2])
-                goto_state = parsing_table[current_state].get(head, '')
-                if goto_state == '':
-                    return {
-                        'success': False,
-                        'message': f"No goto for {head} in state {current_state}",
-                        'steps': parse_steps
-                    }
-                stack.append(goto_state)
-            else:
-                # Pop 2*len(body) elements (symbols and states)
-                pop_len = 2 * len(body)
-                if len(stack) < pop_len:
-                    return {
-                        'success': False,
-                        'message': f"Stack underflow when reducing by {production}",
-                        'steps': parse_steps
-                    }
-                
-                stack = stack[:-pop_len]
-                current_state = int(stack[-1])
-                
-                parse_steps.append({
-                    'stack': ' '.join(stack),
-                    'input': input_string,
-                    'action': f"Reduce by {production}"
-                })
-                
-                # Push the head and new state
-                stack.append(head)
-                goto_state = parsing_table[current_state].get(head, '')
-                if goto_state == '':
-                    return {
-                        'success': False,
-                        'message': f"No goto for {head} in state {current_state}",
-                        'steps': parse_steps
-                    }
-                stack.append(goto_state)
-                
-        else:
-            return {
-                'success': False,
-                'message': f"Unknown action {action}",
-                'steps': parse_steps
-            }
-
-def parse_string_ll1(input_string, parsing_table, start_symbol):
-    stack = ['$', start_symbol]
-    input_string = input_string + '$'
-    parse_steps = []
-    
-    parse_steps.append({
-        'stack': ' '.join(stack),
-        'input': input_string,
-        'action': 'Initial'
-    })
-    
-    while True:
-        if not stack:
-            return {
-                'success': False,
-                'message': 'Stack is empty',
-                'steps': parse_steps
-            }
-            
-        top = stack[-1]
-        current_input = input_string[0]
-        
-        if top == '$' and current_input == '$':
-            parse_steps.append({
-                'stack': ' '.join(stack),
-                'input': input_string,
-                'action': 'Accept'
-            })
-            return {
-                'success': True,
-                'message': 'String accepted!',
-                'steps': parse_steps
-            }
-            
-        elif top in t_list or top == '$':
-            if top == current_input:
-                stack.pop()
-                input_string = input_string[1:]
-                parse_steps.append({
-                    'stack': ' '.join(stack),
-                    'input': input_string,
-                    'action': f"Match '{top}'"
-                })
-            else:
-                return {
-                    'success': False,
-                    'message': f"Expected '{top}', found '{current_input}'",
-                    'steps': parse_steps
-                }
-                
-        elif top in nt_list:
-            production = parsing_table[top].get(current_input, '')
-            if not production:
-                return {
-                    'success': False,
-                    'message': f"No production for {top} on '{current_input}'",
-                    'steps': parse_steps
-                }
-                
-            stack.pop()
-            head, body = production.split('->')
-            
-            if body != 'ϵ':  # If not epsilon production
-                # Push symbols in reverse order
-                for symbol in reversed(body):
-                    stack.append(symbol)
-                    
-            parse_steps.append({
-                'stack': ' '.join(stack),
-                'input': input_string,
-                'action': f"Apply {production}"
-            })
-            
-        else:
-            return {
-                'success': False,
-                'message': f"Unknown symbol '{top}' on stack",
-                'steps': parse_steps
-            }
+# The only state shared between requests; it is locked internally. Builds
+# are also kept on disk only when GRAMMAR_CACHE_DIR is set, and that
+# directory must be private to the app since its pickles are loaded as is.
+grammar_cache = GrammarCache(
+    capacity=int(os.environ.get('GRAMMAR_CACHE_SIZE', 128)),
+    directory=os.environ.get('GRAMMAR_CACHE_DIR') or None,
+    disk_capacity=int(os.environ.get('GRAMMAR_CACHE_DISK_SIZE', 1024))
+)
+
+# Long builds submitted to /jobs run on this pool and land in the same cache
+build_jobs = JobManager(
+    grammar_cache,
+    processes=int(os.environ.get('GRAMMAR_JOB_PROCESSES', 0)) or None,
+    on_build=record_build
+)
+
+# Compiles through the shared cache; fresh builds are counted in /metrics
+def build_grammar(text, kind, **options):
+    compiled, cached = compile_grammar(text, kind, grammar_cache, **options)
+    if not cached:
+        record_build(compiled)
+    return compiled, cached
+
+# What a request asks to build: the kind, from 'parser' unless the route fixes
+# it, and the options that go into the cache key. data is the JSON body, or
+# the query string for /parse_stream. The last item is an error response for
+# an unknown parser or method, and None otherwise.
+def requested_build(data, kind=None):
+    kind = data.get('parser', 'lr') if kind is None else kind
+    if kind not in ('lr', 'll1'):
+        return None, None, (jsonify({
+            'error': f"Unknown parser '{kind}'"
+        }), 400)
+    options = {'tokenized': data.get('grammar_format') == 'tokens'}
+    if kind == 'lr':
+        method = data.get('method', 'lr1')
+        if method not in LR_METHODS:
+            return None, None, (jsonify({
+                'error': f"Unknown method '{method}'"
+            }), 400)
+        options['method'] = method
+        options['compress_table'] = bool(data.get('compress_table'))
+        options['compare_lr1'] = bool(data.get('compare_lr1'))
+    return kind, options, None
+
+# Compiles the grammar a request asks for through the cache. Returns the
+# build, whether it was cached, and the error response of requested_build.
+# extra holds build arguments outside the cache key (profile_memory, base).
+def build_from_request(data, kind=None, **extra):
+    kind, options, error = requested_build(data, kind)
+    if error is not None:
+        return None, False, error
+    compiled, cached = build_grammar(data.get('grammar', ''), kind, **options, **extra)
+    return compiled, cached, None
 
 @app.route('/compute', methods=['POST'])
 def compute():
-    reset_globals()
     data = request.json
-    grammar = data.get('grammar', '')
     input_string = data.get('input_string', '')
-    lines = grammar.strip().split('\n')
-
-    for line in lines:
-        line = line.strip().replace(' ', '')
-        if line == '':
-            continue
-        production_list.append(line)
-
-        head, body = line.split('->')
-
-        if head not in nt_list:
-            nt_list[head] = NonTerminal(head)
-
-        for symbol in body:
-            if not symbol.isupper():
-                if symbol not in t_list:
-                    t_list[symbol] = Terminal(symbol)
-            else:
-                if symbol not in nt_list:
-                    nt_list[symbol] = NonTerminal(symbol)
-
-    for nt in nt_list:
-        compute_first(nt)
-    for nt in nt_list:
-        compute_follow(nt)
-
-    augment_grammar()
-    states = calc_states()
-    table = build_parsing_table(states)
-
-    first_result = {nt: sorted(list(nt_list[nt].first)) for nt in nt_list}
-    follow_result = {nt: sorted(list(nt_list[nt].follow)) for nt in nt_list}
-    states_str_list = []
-    for idx, state in enumerate(states):
-        state_lines = [f"Item {idx}:"]
-        for item in state:
-            lookahead = "|".join(item.lookahead)
-            state_lines.append(f"  {str(item)} , {lookahead}")
-        states_str_list.append("\n".join(state_lines))
-
-    # Convert parsing table to a string
-    table_str = []
-    header = ['State'] + list(t_list.keys()) + ['$'] + list(nt_list.keys())
-    table_str.append('\t'.join(header))
-    for idx, row in enumerate(table):
-        row_str = [str(idx)] + [row.get(sym, '') for sym in header[1:]]
-        table_str.append('\t'.join(row_str))
+    # glr parses on every action of conflicting cells; it has no trace
+    glr = bool(data.get('glr'))
+    if glr and data.get('trace'):
+        return jsonify({
+            'error': "trace is not available with glr"
+        }), 400
+
+    compiled, cached, error = build_from_request(
+        data, 'lr',
+        profile_memory=bool(data.get('metrics')),
+        base=compiled_for_handle(data.get('base'))
+    )
+    if error is not None:
+        return error
 
     # Parse the input string if provided
     parsing_result = None
+    timings = {}
     if input_string:
-        parsing_result = parse_string_slr(input_string, table)
-
-    return jsonify({
-        'FIRST': first_result,
-        'FOLLOW': follow_result,
-        'STATES': "\n\n".join(states_str_list),
-        'TABLE': "\n".join(table_str),
-        'PARSING_RESULT': parsing_result
-    })
-
-def compute_ll1_table():
-    table = {}
-    for nt in nt_list:
-        table[nt] = {}
-        for t in list(t_list.keys()) + ['$']:
-            table[nt][t] = ''
-
-    for prod in production_list:
-        head, body = prod.split('->')
-        first_of_body = set()
-        
-        if body == '':  # Empty production
-            first_of_body = {'ϵ'}
+        start = time.perf_counter()
+        if glr:
+            parsing_result = parse_string_glr(compiled, input_string, build_forest=bool(data.get('build_tree')))
         else:
-            # Calculate FIRST of the body
-            has_epsilon = True
-            for symbol in body:
-                if not has_epsilon:
-                    break
-                if symbol in t_list:
-                    first_of_body.add(symbol)
-                    has_epsilon = False
-                else:
-                    symbol_first = nt_list[symbol].first
-                    first_of_body |= symbol_first - {'ϵ'}
-                    if 'ϵ' not in symbol_first:
-                        has_epsilon = False
-            if has_epsilon:
-                first_of_body.add('ϵ')
-
-        # For each terminal in FIRST(body), add the production to the table
-        for terminal in first_of_body - {'ϵ'}:
-            if table[head][terminal]:
-                return None, f"Grammar is not LL(1): Conflict at {head}, {terminal}"
-            table[head][terminal] = prod
-
-        # If ϵ is in FIRST(body), add the production to FOLLOW(head)
-        if 'ϵ' in first_of_body:
-            for terminal in nt_list[head].follow:
-                if table[head][terminal]:
-                    return None, f"Grammar is not LL(1): Conflict at {head}, {terminal}"
-                table[head][terminal] = prod
-
-    return table, None
+            parsing_result = parse_string_slr(
+                compiled, input_string,
+                trace=bool(data.get('trace')),
+                build_tree=bool(data.get('build_tree')),
+                recover=bool(data.get('recover'))
+            )
+        timings['parse'] = time.perf_counter() - start
+        record_parse('glr' if glr else compiled.kind, timings['parse'], parsing_result['success'])
+        if 'tree' in parsing_result:
+            parsing_result['tree'] = parsing_result['tree'].to_dict()
+        if 'forest' in parsing_result:
+            parsing_result['forest'] = parsing_result['forest'].to_dict()
+
+    response = compiled.response(lazy=bool(data.get('lazy')), timings=timings)
+    response['PARSING_RESULT'] = parsing_result
+    response['CACHED'] = cached
+    if data.get('metrics'):
+        response['METRICS'] = compiled.metrics.result(timings)
+    return jsonify(response)
 
 @app.route('/compute_ll1', methods=['POST'])
 def compute_ll1():
-    reset_globals()
     data = request.json
-    grammar = data.get('grammar', '')
     input_string = data.get('input_string', '')
-    lines = grammar.strip().split('\n')
-
-    for line in lines:
-        line = line.strip().replace(' ', '')
-        if line == '':
-            continue
-        production_list.append(line)
-
-        head, body = line.split('->')
-
-        if head not in nt_list:
-            nt_list[head] = NonTerminal(head)
-
-        for symbol in body:
-            if not symbol.isupper():
-                if symbol not in t_list:
-                    t_list[symbol] = Terminal(symbol)
-            else:
-                if symbol not in nt_list:
-                    nt_list[symbol] = NonTerminal(symbol)
-
-    # Compute FIRST and FOLLOW sets
-    for nt in nt_list:
-        compute_first(nt)
-    for nt in nt_list:
-        compute_follow(nt)
-
-    # Compute LL(1) parsing table
-    parsing_table, error = compute_ll1_table()
-    
-    if error:
-        return jsonify({
-            'error': error
-        }), 400
 
-    # Convert parsing table to string format
-    table_str = []
-    terminals = list(t_list.keys()) + ['$']
-    header = ['Non-Terminal'] + terminals
-    table_str.append('\t'.join(header))
-    
-    for nt in nt_list:
-        row = [nt] + [parsing_table[nt][t] for t in terminals]
-        table_str.append('\t'.join(row))
+    compiled, cached, _ = build_from_request(
+        data, 'll1',
+        profile_memory=bool(data.get('metrics')),
+        base=compiled_for_handle(data.get('base'))
+    )
 
-    first_result = {nt: sorted(list(nt_list[nt].first)) for nt in nt_list}
-    follow_result = {nt: sorted(list(nt_list[nt].follow)) for nt in nt_list}
+    if compiled.error:
+        return jsonify({
+            'error': compiled.error,
+            'conflicts': compiled.conflicts
+        }), 400
 
     # Parse the input string if provided
     parsing_result = None
-    if input_string and not error:
-        start_symbol = production_list[0].split('->')[0]
-        parsing_result = parse_string_ll1(input_string, parsing_table, start_symbol)
+    timings = {}
+    if input_string:
+        start = time.perf_counter()
+        parsing_result = parse_string_ll1(
+            compiled, input_string,
+            trace=bool(data.get('trace')),
+            build_tree=bool(data.get('build_tree')),
+            recover=bool(data.get('recover'))
+        )
+        timings['parse'] = time.perf_counter() - start
+        record_parse(compiled.kind, timings['parse'], parsing_result['success'])
+        if 'tree' in parsing_result:
+            parsing_result['tree'] = parsing_result['tree'].to_dict()
+
+    response = compiled.response(lazy=bool(data.get('lazy')), timings=timings)
+    response['PARSING_RESULT'] = parsing_result
+    response['CACHED'] = cached
+    if data.get('metrics'):
+        response['METRICS'] = compiled.metrics.result(timings)
+    return jsonify(response)
+
+# Every LR or LL(1) conflict of a grammar, collected while its table is built
+@app.route('/conflicts', methods=['POST'])
+def conflicts():
+    compiled, cached, error = build_from_request(request.json)
+    if error is not None:
+        return error
+
+    response = compiled.conflicts_result()
+    response['CACHED'] = cached
+    return jsonify(response)
+
+# Compiles the grammar once and streams one NDJSON line per input string
+@app.route('/parse_batch', methods=['POST'])
+def parse_batch_route():
+    data = request.json
+    inputs = data.get('inputs', [])
+    compiled, _, error = build_from_request(data)
+    if error is not None:
+        return error
+    if compiled.error:
+        return jsonify({
+            'error': compiled.error
+        }), 400
 
+    results = parse_batch(
+        compiled, inputs,
+        processes=int(data.get('processes') or 0),
+        include_steps=bool(data.get('include_steps'))
+    )
+
+    def generate():
+        for result in results:
+            record_parse(compiled.kind, None, result['success'])
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Parses a request body of any size as it arrives. The body is the raw input
+# text; grammar, parser, method and grammar_format come from the query string.
+@app.route('/parse_stream', methods=['POST'])
+def parse_stream_route():
+    compiled, _, error = build_from_request(request.args)
+    if error is not None:
+        return error
+    if compiled.error:
+        return jsonify({
+            'error': compiled.error
+        }), 400
+
+    start = time.perf_counter()
+    result = parse_stream(compiled, read_chunks(request.stream))
+    record_parse(compiled.kind, time.perf_counter() - start, result['success'])
+    return jsonify(result)
+
+# Starts building a grammar in the background and returns the job at once.
+# Takes the same fields as /compute (or /compute_ll1 with parser 'll1'),
+# without the input string.
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    data = request.json
+    kind, options, error = requested_build(data)
+    if error is not None:
+        return error
+    job = build_jobs.submit(data.get('grammar', ''), kind, profile_memory=bool(data.get('metrics')), **options)
+    return jsonify(build_jobs.status(job)), 202
+
+# Status of a job: queued, running, done or failed, and the number of LR
+# states discovered so far
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = build_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': f"Unknown job '{job_id}'"
+        }), 404
+    return jsonify(build_jobs.status(job))
+
+# The artifacts /compute would have returned, once the job is done
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = build_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': f"Unknown job '{job_id}'"
+        }), 404
+    if job.status == 'failed':
+        return jsonify({
+            'error': job.error
+        }), 500
+    if job.status != 'done':
+        return jsonify(build_jobs.status(job)), 202
+
+    compiled = job.compiled
+    if compiled.error:
+        return jsonify({
+            'error': compiled.error,
+            'conflicts': compiled.conflicts
+        }), 400
+    timings = {}
+    response = compiled.response(lazy=bool(request.args.get('lazy')), timings=timings)
+    response['CACHED'] = job.cached
+    if request.args.get('metrics'):
+        response['METRICS'] = compiled.metrics.result(timings)
+    return jsonify(response)
+
+# Rows per /states or /table page by default, and at most
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# The cached build behind a HANDLE, or None when it is unknown or evicted
+def compiled_for_handle(handle):
+    if not re.fullmatch(r'[0-9a-f]{64}', handle or ''):
+        return None
+    return grammar_cache.get(handle)
+
+# Row ids picked by ?rows=3,7,9 or by ?offset=&limit=, within count rows
+def requested_rows(args, count):
+    if args.get('rows'):
+        rows = [int(row) for row in args['rows'].split(',')]
+        if any(row < 0 or row >= count for row in rows):
+            raise ValueError(f"Rows must be between 0 and {count - 1}")
+        return rows
+    offset = int(args.get('offset', 0))
+    limit = min(int(args.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    if offset < 0 or limit < 0:
+        raise ValueError("offset and limit must not be negative")
+    return list(range(offset, min(offset + limit, count)))
+
+# A page of the STATES text of a build returned with lazy=true
+@app.route('/states', methods=['GET'])
+def states_page():
+    compiled = compiled_for_handle(request.args.get('handle'))
+    if compiled is None:
+        return jsonify({
+            'error': "Unknown or expired handle; compile the grammar again"
+        }), 404
+    if compiled.kind == 'll1':
+        return jsonify({
+            'error': "LL(1) grammars have no states"
+        }), 400
+    try:
+        rows = requested_rows(request.args, compiled.row_count())
+    except ValueError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
     return jsonify({
-        'FIRST': first_result,
-        'FOLLOW': follow_result,
-        'TABLE': '\n'.join(table_str),
-        'PARSING_RESULT': parsing_result
+        'STATES': compiled.states_text(rows),
+        'ROWS': rows,
+        'STATE_COUNT': compiled.row_count()
     })
 
+# A page of the TABLE text: the header and the rows asked for
+@app.route('/table', methods=['GET'])
+def table_page():
+    compiled = compiled_for_handle(request.args.get('handle'))
+    if compiled is None:
+        return jsonify({
+            'error': "Unknown or expired handle; compile the grammar again"
+        }), 404
+    if compiled.error:
+        return jsonify({
+            'error': compiled.error
+        }), 400
+    try:
+        rows = requested_rows(request.args, compiled.row_count())
+    except ValueError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    return jsonify({
+        'TABLE': compiled.table_text(rows),
+        'ROWS': rows,
+        'TABLE_ROWS': compiled.row_count()
+    })
+
+# Autocompletion: the terminals that can follow an input prefix, for the
+# build behind a handle
+@app.route('/expected', methods=['POST'])
+def expected():
+    data = request.json
+    compiled = compiled_for_handle(data.get('handle'))
+    if compiled is None:
+        return jsonify({
+            'error': "Unknown or expired handle; compile the grammar again"
+        }), 404
+    if compiled.error:
+        return jsonify({
+            'error': compiled.error
+        }), 400
+    return jsonify(expected_after(compiled, data.get('input_string', '')))
+
+# Build and parse counters in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(grammar_cache), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
\ No newline at end of file
+    app.run(port=5000, debug=True, threaded=True)
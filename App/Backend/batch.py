@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from parsers import parse_input
+
+CHUNK_SIZE = 256
+
+# Set once per pool worker by the initializer, so the compiled grammar is
+# pickled to each worker once instead of with every chunk
+worker_compiled = None
+
+
+def init_worker(compiled):
+    global worker_compiled
+    worker_compiled = compiled
+
+
+def parse_one(compiled, index, input_string, include_steps):
+    result = parse_input(compiled, input_string, trace=include_steps)
+    line = {
+        'index': index,
+        'input': input_string,
+        'success': result['success'],
+        'message': result['message'],
+        'position': result['position']
+    }
+    if 'expected' in result:
+        line['expected'] = result['expected']
+    if include_steps:
+        line['steps'] = result['steps']
+    return line
+
+
+def parse_chunk(chunk):
+    start, inputs, include_steps = chunk
+    return [parse_one(worker_compiled, start + i, s, include_steps) for i, s in enumerate(inputs)]
+
+
+def chunks(inputs, include_steps, size):
+    for start in range(0, len(inputs), size):
+        yield start, inputs[start:start + size], include_steps
+
+
+# Parses every input against one compiled grammar and yields one result per
+# input, in input order. With processes > 1 the inputs are split into chunks
+# and parsed on a process pool.
+def parse_batch(compiled, inputs, processes=None, include_steps=False, chunk_size=CHUNK_SIZE):
+    inputs = list(inputs)
+    if processes:
+        processes = min(processes, os.cpu_count() or 1, -(-len(inputs) // chunk_size))
+    if not processes or processes <= 1:
+        for i, s in enumerate(inputs):
+            yield parse_one(compiled, i, s, include_steps)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(compiled,)) as pool:
+        for results in pool.map(parse_chunk, chunks(inputs, include_steps, chunk_size)):
+            yield from results
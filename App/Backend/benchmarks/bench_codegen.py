@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from codegen import generate_module
+from compiler import compile_grammar
+from parsers import parse_input
+
+EXPR = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+TOKENS = r"""%token ID [a-zA-Z_][a-zA-Z0-9_]*
+%token NUM \d+
+Stmts -> Stmts Stmt | Stmt
+Stmt -> ID '=' Expr ';' | 'if' '(' Expr ')' Stmt | 'while' '(' Expr ')' Stmt | '{' Stmts '}'
+Expr -> Expr '==' Sum | Expr '<' Sum | Sum
+Sum -> Sum '+' Term | Sum '-' Term | Term
+Term -> Term '*' Factor | Term '/' Factor | Factor
+Factor -> '(' Expr ')' | ID | NUM | '-' Factor"""
+
+# Timed in a fresh interpreter so the module really is imported from scratch
+IMPORT_TIMER = "import sys, time; sys.path.insert(0, {path!r}); t = time.perf_counter(); import {name}; print(time.perf_counter() - t)"
+
+
+def import_time(directory, name):
+    code = IMPORT_TIMER.format(path=directory, name=name)
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return float(subprocess.check_output([sys.executable, '-c', code], env=env).decode())
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(label, text, tokenized, inputs, directory):
+    name = f"generated_{label}"
+    start = time.perf_counter()
+    compiled, _ = compile_grammar(text, 'lr', tokenized=tokenized, method='lalr1', compress_table=False, compare_lr1=False)
+    compile_seconds = time.perf_counter() - start
+
+    path = os.path.join(directory, name + '.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_module(compiled))
+    cold = import_time(directory, name)   # compiles the source and writes the .pyc
+    warm = import_time(directory, name)   # loads the .pyc
+
+    sys.path.insert(0, directory)
+    module = __import__(name)
+    print(f"\n{label}: {len(compiled.states)} states, {os.path.getsize(path)} bytes of source")
+    print(f"  compile_grammar {compile_seconds * 1e3:9.2f} ms")
+    print(f"  import (source) {cold * 1e3:9.2f} ms")
+    print(f"  import (.pyc)   {warm * 1e3:9.2f} ms")
+    print(f"  {'input length':>14} {'parse_input ms':>15} {'generated ms':>13} {'speedup':>8}")
+    for s in inputs:
+        assert module.parse(s) == parse_input(compiled, s)
+        library = best_of(lambda: parse_input(compiled, s))
+        generated = best_of(lambda: module.parse(s))
+        print(f"  {len(s):>14} {library * 1e3:>15.3f} {generated * 1e3:>13.3f} {library / generated:>8.2f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        bench('expr', EXPR, False, ['+'.join(['i*(i+i)'] * n) for n in (10, 1000, 20000)], directory)
+        program = 'x = 1; if (x < 10) { y = x * (x + 2); while (y == 0) z = -y / 3; } '
+        bench('statements', TOKENS, True, [program * n for n in (1, 100, 2000)], directory)
+
+
+if __name__ == '__main__':
+    main()
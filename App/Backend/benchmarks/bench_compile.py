@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import CORPUS, sentence
+from compiler import CompiledGrammar, ll1_expansions
+from grammar import Grammar, compute_first_follow
+from ll1 import compute_ll1_table
+from lr import calc_states, calc_lalr_states, closure, build_parsing_table
+from parsers import recognize_slr, recognize_ll1
+
+BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+STAGES = ('first_follow', 'll1_table', 'lr1_states', 'closure', 'lalr_states', 'lr1_table', 'parse_lr', 'parse_ll1')
+SENTENCE_LENGTH = 5000
+
+
+def timed(times, stage, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = (time.perf_counter() - start) * 1e3
+    times[stage] = min(times.get(stage, elapsed), elapsed)
+    return result
+
+
+# One pass over every stage on a fresh Grammar, so no interned items or
+# memoized FIRST sets carry over between repeats
+def run_once(text, tokenized, times):
+    grammar = Grammar.from_text(text, tokenized)
+    timed(times, 'first_follow', compute_first_follow, grammar)
+    ll1_table, ll1_conflicts = timed(times, 'll1_table', compute_ll1_table, grammar)
+    symbols = sentence(grammar, SENTENCE_LENGTH)
+
+    grammar.augment()
+    states, transitions = timed(times, 'lr1_states', calc_states, grammar)
+    kernels = [[item for item in state if item.dot or item.prod == 0] for state in states]
+    timed(times, 'closure', lambda: [closure(grammar, kernel) for kernel in kernels])
+    lalr_states, _ = timed(times, 'lalr_states', calc_lalr_states, grammar)
+    conflicts = []
+    table = timed(times, 'lr1_table', build_parsing_table, grammar, states, transitions, conflicts)
+
+    lr = CompiledGrammar(grammar, 'lr', 'lr1')
+    lr.table = table
+    lr_result = timed(times, 'parse_lr', recognize_slr, lr, symbols)
+
+    ll_result = None
+    if not ll1_conflicts:
+        ll = CompiledGrammar(Grammar.from_text(text, tokenized), 'll1')
+        ll.expansions = ll1_expansions(ll.grammar, ll1_table)
+        ll_result = timed(times, 'parse_ll1', recognize_ll1, ll, symbols)
+
+    return {
+        'productions': len(grammar.rules) - 1,
+        'terminals': len(grammar.t_list),
+        'nonterminals': len(grammar.nt_list),
+        'lr1_states': len(states),
+        'lr1_items': sum(len(state) for state in states),
+        'closure_calls': len(kernels),
+        'lalr_states': len(lalr_states),
+        'lr1_conflicts': len(conflicts),
+        'll1_conflicts': len(ll1_conflicts),
+        'sentence_length': len(symbols),
+        'lr_accepts': lr_result['success'],
+        'll1_accepts': ll_result['success'] if ll_result else None,
+    }
+
+
+def run(names=None, repeat=3):
+    results = {}
+    for name, text, tokenized in CORPUS:
+        if names and name not in names:
+            continue
+        times = {}
+        for _ in range(repeat):
+            counts = run_once(text, tokenized, times)
+        results[name] = {'counts': counts, 'ms': {stage: round(times[stage], 3) for stage in STAGES if stage in times}}
+    return results
+
+
+def report(results):
+    print(f"{'grammar':<14} {'prods':>5} {'lr1':>5} {'items':>6} {'lalr':>5}  " + ' '.join(f"{s:>12}" for s in STAGES))
+    for name, result in results.items():
+        c, ms = result['counts'], result['ms']
+        cells = ' '.join(f"{ms[s]:>12.3f}" if s in ms else f"{'-':>12}" for s in STAGES)
+        print(f"{name:<14} {c['productions']:>5} {c['lr1_states']:>5} {c['lr1_items']:>6} {c['lalr_states']:>5}  {cells}")
+
+
+# A stage regresses when it is both tolerance times slower than the baseline
+# and at least min_ms slower; any change in the counts is reported as well
+def compare(results, baseline, tolerance, min_ms):
+    problems = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        for key, value in result['counts'].items():
+            if key in old['counts'] and old['counts'][key] != value:
+                problems.append(f"{name}: {key} changed from {old['counts'][key]} to {value}")
+        for stage, ms in result['ms'].items():
+            before = old['ms'].get(stage)
+            if before is not None and ms > before * (1 + tolerance) and ms - before > min_ms:
+                problems.append(f"{name}: {stage} took {ms:.3f} ms, baseline {before:.3f} ms")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time every grammar compilation stage over the benchmark corpus.')
+    parser.add_argument('grammars', nargs='*', help='corpus entries to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown, as a fraction')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args(argv)
+
+    results = run(args.grammars, args.repeat)
+    report(results)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nno baseline to compare against (run with --save)")
+        return 0
+    with open(args.baseline) as f:
+        problems = compare(results, json.load(f), args.tolerance, args.min_ms)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if not problems:
+        print("\nno regressions against the baseline")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from first_follow import compute_first_follow
+
+
+# Chain of expression-like layers: N{i} -> N{i} op{i} M{i} | M{i}, M{i} -> ( N{i+1} ) | id{i} | ,
+# plus a back edge so neighbouring layers are mutually recursive
+def synthetic_grammar(layers):
+    productions = []
+    for i in range(layers):
+        N, M, nxt = f'N{i}', f'M{i}', f'N{(i + 1) % layers}'
+        productions.append((N, (N, f'op{i}', M)))
+        productions.append((N, (M,)))
+        productions.append((M, ('(', nxt, ')')))
+        productions.append((M, (f'id{i}',)))
+        productions.append((M, ()))
+    nonterminals = []
+    for head, _ in productions:
+        if head not in nonterminals:
+            nonterminals.append(head)
+    return productions, nonterminals
+
+
+def bench(layers, repeat=5):
+    productions, nonterminals = synthetic_grammar(layers)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compute_first_follow(productions, nonterminals)
+        best = min(best, time.perf_counter() - start)
+    return len(productions), best
+
+
+def main():
+    print(f"{'productions':>12} {'seconds':>10} {'us/production':>14}")
+    for layers in (20, 40, 80, 160, 320, 640):
+        n, seconds = bench(layers)
+        print(f"{n:>12} {seconds:>10.4f} {seconds / n * 1e6:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
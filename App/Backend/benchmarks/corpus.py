@@ -0,0 +1,130 @@
+import random
+
+# Grammars for the compile benchmarks, smallest first. Each entry is
+# (name, grammar text, tokenized). Classic grammars use single-character
+# symbols; the rest use the %token format.
+
+EXPR_LR = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+EXPR_LL = "E->TA\nA->+TA\nA->\nT->FB\nB->*FB\nB->\nF->(E)\nF->i"
+
+EXPR_LEVELS = r"""%token ID [a-zA-Z_][a-zA-Z0-9_]*
+%token NUM \d+
+Expr -> Expr '||' And | And
+And -> And '&&' Eq | Eq
+Eq -> Eq '==' Rel | Eq '!=' Rel | Rel
+Rel -> Rel '<' Add | Rel '>' Add | Add
+Add -> Add '+' Mul | Add '-' Mul | Mul
+Mul -> Mul '*' Unary | Mul '/' Unary | Unary
+Unary -> '-' Unary | '!' Unary | Primary
+Primary -> '(' Expr ')' | ID | NUM"""
+
+JSON = r"""%token STRING "([^"\\]|\\.)*"
+%token NUMBER -?\d+(\.\d+)?([eE][+-]?\d+)?
+Value -> Object | Array | STRING | NUMBER | 'true' | 'false' | 'null'
+Object -> '{' '}' | '{' Members '}'
+Members -> Pair | Members ',' Pair
+Pair -> STRING ':' Value
+Array -> '[' ']' | '[' Elements ']'
+Elements -> Value | Elements ',' Value"""
+
+C_SUBSET = r"""%token ID [a-zA-Z_][a-zA-Z0-9_]*
+%token NUM \d+
+%token STR "([^"\\]|\\.)*"
+%skip \s+
+%skip //[^\n]*
+Program -> Program Decl | Decl
+Decl -> Type ID ';' | Type ID '=' Expr ';' | Type ID '(' Params ')' Block
+Type -> 'int' | 'char' | 'void' | Type '*'
+Params -> ParamList | ϵ
+ParamList -> Param | ParamList ',' Param
+Param -> Type ID
+Block -> '{' Stmts '}'
+Stmts -> Stmts Stmt | ϵ
+Stmt -> Block | Expr ';' | Type ID ';' | Type ID '=' Expr ';' | ';'
+Stmt -> 'if' '(' Expr ')' Stmt | 'if' '(' Expr ')' Stmt 'else' Stmt
+Stmt -> 'while' '(' Expr ')' Stmt | 'for' '(' OptExpr ';' OptExpr ';' OptExpr ')' Stmt
+Stmt -> 'return' OptExpr ';' | 'break' ';'
+OptExpr -> Expr | ϵ
+Expr -> Unary '=' Expr | Or
+Or -> Or '||' And | And
+And -> And '&&' Eq | Eq
+Eq -> Eq '==' Rel | Eq '!=' Rel | Rel
+Rel -> Rel '<' Add | Rel '>' Add | Rel '<=' Add | Rel '>=' Add | Add
+Add -> Add '+' Mul | Add '-' Mul | Mul
+Mul -> Mul '*' Unary | Mul '/' Unary | Mul '%' Unary | Unary
+Unary -> '-' Unary | '!' Unary | '*' Unary | '&' Unary | Postfix
+Postfix -> Postfix '(' Args ')' | Postfix '[' Expr ']' | Primary
+Args -> ArgList | ϵ
+ArgList -> Expr | ArgList ',' Expr
+Primary -> ID | NUM | STR | '(' Expr ')'"""
+
+
+# Chain of expression-like layers, as in bench_first_follow, written in the
+# tokenized format: N{i} -> N{i} op{i} M{i} | M{i}, M{i} -> ( N{i+1} ) | id{i} | ϵ
+def synthetic(layers):
+    lines = []
+    for i in range(layers):
+        N, M, nxt = f'N{i}', f'M{i}', f'N{(i + 1) % layers}'
+        lines.append(f"{N} -> {N} op{i} {M} | {M}")
+        lines.append(f"{M} -> '(' {nxt} ')' | id{i} | ϵ")
+    return '\n'.join(lines)
+
+
+CORPUS = [
+    ('expr-lr', EXPR_LR, False),
+    ('expr-ll', EXPR_LL, False),
+    ('expr-levels', EXPR_LEVELS, True),
+    ('json', JSON, True),
+    ('c-subset', C_SUBSET, True),
+    ('synthetic-8', synthetic(8), True),
+    ('synthetic-32', synthetic(32), True),
+    ('synthetic-96', synthetic(96), True),
+]
+
+
+# A random sentence of roughly `length` terminals derived from the start
+# symbol. Under the length budget the last pending non-terminal always takes
+# a production that keeps a non-terminal, so the sentence cannot end early;
+# past it every non-terminal takes its shortest production, so it always ends.
+def sentence(grammar, length, seed=0):
+    rng = random.Random(seed)
+    bodies = {}
+    for head, body in grammar.rules:
+        bodies.setdefault(head, []).append(body)
+    heads = bodies
+
+    inf = float('inf')
+    cost = dict.fromkeys(heads, inf)
+    changed = True
+    while changed:
+        changed = False
+        for head, body in grammar.rules:
+            c = sum(cost[s] if s in heads else 1 for s in body)
+            if c < cost[head]:
+                cost[head] = c
+                changed = True
+    shortest = {
+        head: min(options, key=lambda body: (sum(cost[s] if s in heads else 1 for s in body), len(body)))
+        for head, options in bodies.items()
+    }
+    growing = {head: [body for body in options if any(s in heads for s in body)] or options for head, options in bodies.items()}
+
+    out = []
+    stack = [grammar.start_symbol]
+    pending = 1  # non-terminals on the stack
+    while stack:
+        symbol = stack.pop()
+        if symbol not in heads:
+            out.append(symbol)
+            continue
+        pending -= 1
+        if len(out) + len(stack) >= length:
+            body = shortest[symbol]
+        elif pending:
+            body = rng.choice(bodies[symbol])
+        else:
+            body = rng.choice(growing[symbol])
+        stack.extend(reversed(body))
+        pending += sum(1 for s in body if s in heads)
+    return out
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+# Bump when the layout of cached artifacts changes so old disk entries are ignored
+CACHE_VERSION = 10
+
+
+# Content hash of a normalized production list plus the build options
+# (tokenized among them). Lines are hashed verbatim, each prefixed with its
+# length: spaces separate symbols in the tokenized format and in patterns.
+def grammar_key(kind, production_list, **options):
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}:{kind}\n".encode())
+    for prod in production_list:
+        line = prod.encode()
+        h.update(f"{len(line)}:".encode())
+        h.update(line)
+    for name in sorted(options):
+        h.update(f"{name}={options[name]!r}\n".encode())
+    return h.hexdigest()
+
+
+# Bounded in-memory LRU in front of an optional directory of pickles. The
+# directory keeps at most disk_capacity entries, the least recently used
+# (by file mtime) going first. Entries are unpickled as they are, so the
+# directory must only be writable by this app: a planted file runs code.
+class GrammarCache:
+    def __init__(self, capacity=128, directory=None, disk_capacity=1024):
+        self.capacity = capacity
+        self.directory = directory
+        self.disk_capacity = disk_capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        value = None
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    value = pickle.load(f)
+                os.utime(self._path(key))
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                value = None
+
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+            self._prune()
+        except OSError:
+            pass
+
+    # Drops the least recently used pickles beyond disk_capacity
+    def _prune(self):
+        paths = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                try:
+                    paths.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        if len(paths) <= self.disk_capacity:
+            return
+        paths.sort()
+        for _, path in paths[:len(paths) - self.disk_capacity]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,242 @@
+import argparse
+import sys
+from compiler import compile_grammar, LR_METHODS
+
+# Emits a standalone Python module for an LR grammar: the dense ACTION/GOTO
+# tables as tuple constants (loaded straight from the .pyc, no parsing or
+# OrderedDict at import) and the loop of parsers.lr_step specialised to
+# them. Tokenized grammars also get their DFA lexer.
+
+HEADER = '''# Generated by codegen.py ({method}). Do not edit.
+#
+# parse(text) returns {{'success': bool, 'message': str, 'position': int}}
+# like parse_string_slr, with the 'expected' terminals when a symbol has no
+# action; recognize(symbols) takes any iterable of terminals.
+#
+# Grammar:
+{grammar}
+
+N_STATES = {n_states}
+N_TERMINALS = {n_terminals}
+N_NONTERMINALS = {n_nonterminals}
+TERMINALS = {terminals!r}
+PRODUCTIONS = {productions!r}
+HEADS = {heads!r}
+PROD_HEADS = {prod_heads!r}
+PROD_LENGTHS = {prod_lengths!r}
+
+# ACTION[state * N_TERMINALS + terminal]: 0 error, s + 1 shift, -(p + 1) reduce
+ACTION = {action}
+
+# GOTO[state * N_NONTERMINALS + non-terminal]: target + 1, 0 for none
+GOTO = {goto}
+
+# EXPECTED[state]: bitset over terminal ids of the cells with an action
+EXPECTED = {expected}
+'''
+
+RECOGNIZE = '''
+
+def expected(state):
+    bits = EXPECTED[state]
+    return [t for t, i in TERMINALS.items() if bits >> i & 1]
+
+
+# Reads one symbol: the reductions it triggers, then its shift. Returns the
+# last action and an error message; 0 (error) when the symbol has no action
+# or takes more reductions than N_STATES * (stack depth + N_STATES), which
+# only a cycle of reductions that reads no input does.
+def lr_step(stack, symbol):
+    terminal = TERMINALS.get(symbol)
+    if terminal is None:
+        return 0, f"Invalid symbol '{symbol}' in state {stack[-1]}"
+    action = ACTION
+    goto = GOTO
+    heads = PROD_HEADS
+    lengths = PROD_LENGTHS
+    nt = N_TERMINALS
+    nn = N_NONTERMINALS
+    limit = N_STATES * (len(stack) + N_STATES)
+    reductions = 0
+    while True:
+        act = action[stack[-1] * nt + terminal]
+        if act > 0:
+            stack.append(act - 1)
+            return act, None
+        elif act == -1:
+            return act, None
+        elif act == 0:
+            return act, f"No action for symbol '{symbol}' in state {stack[-1]}"
+        reductions += 1
+        if reductions > limit:
+            return 0, f"Reductions loop on symbol '{symbol}' in state {stack[-1]}"
+        prod = -act - 1
+        size = lengths[prod]
+        if size:
+            if len(stack) <= size:
+                return act, f"Stack underflow when reducing by {PRODUCTIONS[prod]}"
+            del stack[-size:]
+        target = goto[stack[-1] * nn + heads[prod]]
+        if not target:
+            return act, f"No goto for {HEADS[heads[prod]]} in state {stack[-1]}"
+        stack.append(target - 1)
+
+
+def recognize(symbols):
+    tokens = iter(symbols)
+    stack = [0]
+    pos = 0
+    symbol = next(tokens, '$')
+
+    while True:
+        act, message = lr_step(stack, symbol)
+        if act == 0:
+            return {'success': False, 'message': message, 'position': pos, 'expected': expected(stack[-1])}
+        elif message is not None:
+            return {'success': False, 'message': message, 'position': pos}
+        elif act == -1:
+            return {'success': True, 'message': 'String accepted!', 'position': pos}
+        pos += 1
+        symbol = next(tokens, '$')
+'''
+
+PARSE_CHARS = '''
+
+def parse(text):
+    return recognize(text)
+'''
+
+LEXER = '''
+from bisect import bisect_right
+
+# Lexer DFA: ASCII[state * 128 + code] and per-state (lo, hi, target) ranges
+# for other code points; ACCEPT is the winning rule per state, or -1
+ASCII = {ascii}
+RANGE_STARTS = {range_starts!r}
+RANGES = {ranges!r}
+ACCEPT = {accept!r}
+KINDS = {kinds!r}
+
+
+def step(state, code):
+    starts = RANGE_STARTS[state]
+    i = bisect_right(starts, code) - 1
+    if i >= 0:
+        lo, hi, target = RANGES[state][i]
+        if code <= hi:
+            return target
+    return -1
+
+
+def kinds(text, offsets):
+    ascii_rows = ASCII
+    accept = ACCEPT
+    pos = 0
+    n = len(text)
+    while pos < n:
+        state = 0
+        end, priority = pos, -1
+        i = pos
+        while i < n:
+            code = ord(text[i])
+            state = ascii_rows[state * 128 + code] if code < 128 else step(state, code)
+            if state < 0:
+                break
+            i += 1
+            if accept[state] >= 0:
+                end, priority = i, accept[state]
+        if priority < 0:
+            offsets.append(pos)
+            yield text[pos]
+            pos += 1
+            continue
+        kind = KINDS[priority]
+        if kind is not None:
+            offsets.append(pos)
+            yield kind
+        pos = end
+
+
+def parse(text):
+    offsets = []
+    result = recognize(kinds(text, offsets))
+    pos = result['position']
+    result['position'] = offsets[pos] if pos < len(offsets) else len(text)
+    return result
+'''
+
+
+def int_tuple(values, per_line=24):
+    values = list(values)
+    if not values:
+        return '()'
+    lines = [', '.join(str(v) for v in values[i:i + per_line]) for i in range(0, len(values), per_line)]
+    return '(\n    ' + ',\n    '.join(lines) + ',\n)'
+
+
+def dense(matrix):
+    return [matrix.get(r, c) for r in range(matrix.rows) for c in range(matrix.cols)]
+
+
+def generate_module(compiled):
+    grammar = compiled.grammar
+    table = compiled.table
+    source = HEADER.format(
+        method=compiled.method,
+        grammar='\n'.join('#   ' + prod for prod in grammar.production_list),
+        n_states=table.n_states,
+        n_terminals=len(table.terminals),
+        n_nonterminals=len(table.nonterminals),
+        terminals=table.terminal_ids,
+        productions=tuple(grammar.production_list),
+        heads=tuple(table.nonterminals),
+        prod_heads=tuple(table.prod_heads),
+        prod_lengths=tuple(table.prod_lengths),
+        action=int_tuple(dense(table.action)),
+        goto=int_tuple(dense(table.goto)),
+        expected=int_tuple(table.expected_bits, per_line=8)
+    )
+    source += RECOGNIZE
+    if compiled.lexer is None:
+        return source + PARSE_CHARS
+
+    lexer = compiled.lexer
+    return source + LEXER.format(
+        ascii=int_tuple((code for row in lexer.ascii for code in row), per_line=32),
+        range_starts=tuple(tuple(starts) for starts in lexer.range_starts),
+        ranges=tuple(tuple(r) for r in lexer.ranges),
+        accept=tuple(lexer.accept),
+        kinds=tuple(lexer.kinds_by_priority)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a standalone LR parser module for a grammar.')
+    parser.add_argument('grammar', help="grammar file, or '-' for stdin")
+    parser.add_argument('-o', '--output', help='output module (default: stdout)')
+    parser.add_argument('-m', '--method', default='lalr1', choices=LR_METHODS)
+    parser.add_argument('--tokens', action='store_true', help='grammar uses the tokenized format')
+    args = parser.parse_args(argv)
+
+    if args.grammar == '-':
+        text = sys.stdin.read()
+    else:
+        with open(args.grammar, encoding='utf-8') as f:
+            text = f.read()
+
+    compiled, _ = compile_grammar(text, 'lr', tokenized=args.tokens, method=args.method, compress_table=False, compare_lr1=False)
+    for conflict in compiled.conflicts:
+        print(f"warning: {conflict['type']} conflict in state {conflict['state']} on '{conflict['symbol']}', "
+              f"using {conflict['chosen']}", file=sys.stderr)
+
+    source = generate_module(compiled)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
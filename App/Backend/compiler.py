@@ -0,0 +1,333 @@
+import threading
+import time
+from contextlib import nullcontext
+from cache import grammar_key
+from grammar import Grammar, EPSILONS, compute_first_follow
+from lr import calc_states, calc_lr0_states, calc_slr_states, calc_lalr_states, build_parsing_table, conflict_free, reusable_states, state_items, format_item
+from ll1 import compute_ll1_table
+from lexer import build_lexer
+from metrics import BuildMetrics, track_memory
+
+LR_METHODS = ('lr1', 'lalr1', 'slr1', 'lr0', 'auto')
+# What 'auto' tries, cheapest first; the first conflict-free table wins
+AUTO_METHODS = ('lr0', 'slr1', 'lalr1', 'lr1')
+
+
+# A grammar together with everything built from it: FIRST/FOLLOW on the
+# grammar's symbols, the automaton, the table the parser runs on and the
+# response fields. STATES and TABLE text is rendered on first use, since for
+# large automata it dominates the response; requests share a cached build, so
+# that happens under its lock. metrics records how long each stage of the
+# build took (rendering is timed per request instead); key is the cache key
+# the build is stored under. The lexer of base, an earlier build, is reused
+# when the tokens are the same.
+class CompiledGrammar:
+    def __init__(self, grammar, kind, method=None, metrics=None, base=None):
+        self.grammar = grammar
+        self.kind = kind
+        self.method = method
+        self.metrics = metrics if metrics is not None else BuildMetrics()
+        self.states = None
+        self.transitions = None
+        self.table = None
+        self.expansions = None
+        self.expected_bits = None
+        self.lexer = None
+        if grammar.tokenized:
+            if base is not None and same_tokens(base.grammar, grammar):
+                self.lexer = base.lexer
+            else:
+                with self.metrics.stage('lexer'):
+                    self.lexer = build_lexer(grammar)
+        self.error = None
+        self.conflicts = []
+        self.artifacts = {}
+        self.rendered = {}
+        self.render_lock = threading.Lock()
+        self.key = None
+
+    # Builds are pickled into the disk cache and out of job processes; the
+    # lock is not
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['render_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.render_lock = threading.Lock()
+
+    def sets_result(self):
+        nt_list = self.grammar.nt_list
+        first_result = {nt: sorted(list(nt_list[nt].first)) for nt in nt_list}
+        follow_result = {nt: sorted(list(nt_list[nt].follow)) for nt in nt_list}
+        return first_result, follow_result
+
+    # Every conflict found while building the table, with counts per kind
+    def conflicts_result(self):
+        counts = {'total': len(self.conflicts)}
+        for conflict in self.conflicts:
+            if 'type' in conflict:
+                counts[conflict['type']] = counts.get(conflict['type'], 0) + 1
+        return {'CONFLICTS': self.conflicts, 'CONFLICT_COUNT': counts}
+
+    # Terminals that can come next when top is the LR state on top of the
+    # stack, or for LL(1) the symbol there; a lookup of a precomputed bitset
+    def expected(self, top):
+        if self.kind != 'll1':
+            return self.table.expected(top)
+        bits = self.expected_bits.get(top)
+        return [top] if bits is None else self.grammar.lookahead_symbols(bits)
+
+    # Rows of STATES and TABLE: LR state ids, or LL(1) non-terminals
+    def row_count(self):
+        if self.kind == 'll1':
+            return len(self.grammar.nt_list)
+        return len(self.states)
+
+    # STATES text of the given state ids, or of every state. timings, a dict
+    # of the request's own stages, gets render_states when it is rendered.
+    def states_text(self, rows=None, timings=None):
+        if self.kind == 'll1':
+            return None
+        if rows is not None:
+            return render_states(self.grammar, self.states, rows)
+        return self.rendered_text('STATES', lambda: render_states(self.grammar, self.states), timings)
+
+    # TABLE text with the header and the given rows, or every row
+    def table_text(self, rows=None, timings=None):
+        if rows is not None:
+            return self.render_table(rows)
+        return self.rendered_text('TABLE', self.render_table, timings)
+
+    def rendered_text(self, name, render, timings):
+        with self.render_lock:
+            if name not in self.rendered:
+                start = time.perf_counter()
+                self.rendered[name] = render()
+                if timings is not None:
+                    timings['render_' + name.lower()] = time.perf_counter() - start
+            return self.rendered[name]
+
+    def render_table(self, rows=None):
+        if self.kind != 'll1':
+            return render_lr_table(self.table, rows)
+        if rows is not None:
+            nonterminals = list(self.grammar.nt_list)
+            rows = [nonterminals[i] for i in rows]
+        return render_ll1_table(self.grammar, self.table, rows)
+
+    # The response fields of the build. lazy leaves out the STATES and TABLE
+    # text; /states and /table render pages of it from the handle instead.
+    def response(self, lazy=False, timings=None):
+        response = dict(self.artifacts)
+        response['HANDLE'] = self.key
+        if lazy:
+            response['TABLE_ROWS'] = self.row_count()
+        else:
+            if self.kind != 'll1':
+                response['STATES'] = self.states_text(timings=timings)
+            response['TABLE'] = self.table_text(timings=timings)
+        return response
+
+
+def same_tokens(a, b):
+    return (
+        a.tokenized and b.tokenized
+        and a.token_defs == b.token_defs
+        and a.skip_patterns == b.skip_patterns
+        and list(a.t_list) == list(b.t_list)
+    )
+
+def render_states(grammar, states, rows=None):
+    states_str_list = []
+    for idx in range(len(states)) if rows is None else rows:
+        state_lines = [f"Item {idx}:"]
+        for item in state_items(states[idx]):
+            lookahead = "|".join(grammar.lookahead_symbols(item.lookahead))
+            state_lines.append(f"  {format_item(grammar, item)} , {lookahead}")
+        states_str_list.append("\n".join(state_lines))
+    return "\n\n".join(states_str_list)
+
+def render_lr_table(table, rows=None):
+    table_str = []
+    header = ['State'] + table.terminals + table.nonterminals
+    table_str.append('\t'.join(header))
+    for idx in range(table.n_states) if rows is None else rows:
+        row_str = [str(idx)] + table.render_row(idx)
+        table_str.append('\t'.join(row_str))
+    return "\n".join(table_str)
+
+def render_ll1_table(grammar, parsing_table, rows=None):
+    table_str = []
+    terminals = list(grammar.t_list.keys()) + ['$']
+    header = ['Non-Terminal'] + terminals
+    table_str.append('\t'.join(header))
+
+    for nt in grammar.nt_list if rows is None else rows:
+        row = [nt] + [parsing_table[nt][t] for t in terminals]
+        table_str.append('\t'.join(row))
+    return '\n'.join(table_str)
+
+
+# base is an earlier build of a version of the same grammar; what the edit
+# left unchanged is reused from it (see compute_first_follow, reusable_states)
+def compile_lr(grammar, method='lr1', compress_table=False, compare_lr1=False, metrics=None, progress=None, base=None):
+    if method not in LR_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    compiled = CompiledGrammar(grammar, 'lr', method, metrics, base)
+    metrics = compiled.metrics
+    changed = compute_first_follow(grammar, metrics, base.grammar if base is not None else None)
+
+    # LR(0), SLR(1) and LALR(1) share one LR(0) automaton. Closure and goto
+    # calls are counted for the automaton that is kept, its LR(0) part
+    # included, not for rejected candidates or the LR(1) comparison.
+    lr0 = None
+    lr0_counts = {}
+    tried = []
+    for candidate in AUTO_METHODS if method == 'auto' else (method,):
+        tried.append(candidate)
+        with metrics.stage('states'):
+            grammar.augment()
+            if candidate != 'lr1' and lr0 is None:
+                before = dict(grammar.counters)
+                lr0 = calc_lr0_states(grammar, progress)
+                lr0_counts = counter_changes(grammar, before)
+            before = dict(grammar.counters)
+            if candidate == 'lalr1':
+                states, transitions = calc_lalr_states(grammar, progress, lr0)
+            elif candidate != 'lr1':
+                states, transitions = calc_slr_states(grammar, lr0, candidate)
+            else:
+                reuse = None
+                if changed is not None and base.method == 'lr1':
+                    reuse = reusable_states(grammar, base.grammar, base.states, base.transitions, changed)
+                states, transitions = calc_states(grammar, progress, reuse)
+        build_counts = counter_changes(grammar, before)
+        if candidate == 'lr1' or conflict_free(grammar, states, transitions):
+            break
+    if candidate != 'lr1':
+        build_counts = {name: count + lr0_counts[name] for name, count in build_counts.items()}
+    compiled.method = method = candidate
+    with metrics.stage('table'):
+        table = build_parsing_table(grammar, states, transitions, compiled.conflicts)
+    dense_size = table.size()
+    if compress_table:
+        with metrics.stage('compress'):
+            table.compress()
+    compiled.states, compiled.transitions, compiled.table = states, transitions, table
+
+    first_result, follow_result = compiled.sets_result()
+    compiled.artifacts = {
+        'FIRST': first_result,
+        'FOLLOW': follow_result,
+        'METHOD': method,
+        'STATE_COUNT': len(states),
+        'TABLE_CELLS': {'dense': dense_size, 'stored': table.size()}
+    }
+    if len(tried) > 1:
+        compiled.artifacts['METHODS_TRIED'] = tried
+    compiled.artifacts.update(compiled.conflicts_result())
+
+    # Canonical LR(1) is only built for comparison when asked for
+    if method != 'lr1' and compare_lr1:
+        before = dict(grammar.counters)
+        with metrics.stage('compare_lr1'):
+            lr1_count = len(calc_states(grammar)[0])
+        compare_counts = counter_changes(grammar, before)
+        metrics.count('compare_lr1_closure_calls', compare_counts['closure'])
+        metrics.count('compare_lr1_goto_calls', compare_counts['goto'])
+        compiled.artifacts['STATE_SAVINGS'] = {
+            'lr1': lr1_count,
+            method: len(states),
+            'saved': lr1_count - len(states)
+        }
+
+    metrics.count('states', len(states))
+    metrics.count('items', sum(len(state) for state in states))
+    metrics.count('closure_calls', build_counts['closure'])
+    metrics.count('goto_calls', build_counts['goto'])
+    if build_counts['reused']:
+        metrics.count('reused_states', build_counts['reused'])
+    metrics.count('conflicts', len(compiled.conflicts))
+    metrics.count('table_cells', table.size())
+    return compiled
+
+# Closure, goto and reused-state counts since the before snapshot
+def counter_changes(grammar, before):
+    return {name: grammar.counters[name] - before[name] for name in before}
+
+# Reversed production bodies, ready to push for each (non-terminal, terminal);
+# an ϵ body pushes nothing
+def ll1_expansions(grammar, parsing_table):
+    bodies = {
+        prod: tuple(symbol for symbol in reversed(body) if symbol not in EPSILONS)
+        for prod, (_, body) in zip(grammar.production_list, grammar.rules)
+    }
+    return {
+        nt: {t: bodies[prod] for t, prod in row.items() if prod}
+        for nt, row in parsing_table.items()
+    }
+
+def compile_ll1(grammar, metrics=None, base=None):
+    compiled = CompiledGrammar(grammar, 'll1', metrics=metrics, base=base)
+    metrics = compiled.metrics
+    compute_first_follow(grammar, metrics, base.grammar if base is not None else None)
+
+    with metrics.stage('table'):
+        parsing_table, conflicts = compute_ll1_table(grammar)
+    metrics.count('conflicts', len(conflicts))
+    if conflicts:
+        first = conflicts[0]
+        more = f" and {len(conflicts) - 1} more" if len(conflicts) > 1 else ''
+        compiled.error = f"Grammar is not LL(1): Conflict at {first['nonterminal']}, {first['terminal']}{more}"
+        compiled.conflicts = conflicts
+        return compiled
+    compiled.table = parsing_table
+    compiled.expansions = ll1_expansions(grammar, parsing_table)
+    compiled.expected_bits = {
+        nt: grammar.lookahead_bits(t for t, prod in row.items() if prod)
+        for nt, row in parsing_table.items()
+    }
+
+    first_result, follow_result = compiled.sets_result()
+    compiled.artifacts = {
+        'FIRST': first_result,
+        'FOLLOW': follow_result
+    }
+    metrics.count('table_cells', sum(1 for row in parsing_table.values() for prod in row.values() if prod))
+    return compiled
+
+
+# Cache key of grammar text built with the given options
+def compile_key(text, kind='lr', tokenized=False, **options):
+    grammar = Grammar.from_text(text, tokenized)
+    return grammar_key(kind, grammar.normalized_lines(), tokenized=tokenized, **options)
+
+# Compiles grammar text, reusing a cached build of the same grammar and options.
+# Returns the compiled grammar and whether it came from the cache. With
+# profile_memory the peak traced memory of a fresh build is recorded;
+# progress is passed to the LR state builder and is not part of the key.
+# base, an earlier build of the same kind, makes a fresh build incremental.
+def compile_grammar(text, kind='lr', cache=None, tokenized=False, profile_memory=False, progress=None, base=None, **options):
+    start = time.perf_counter()
+    grammar = Grammar.from_text(text, tokenized)
+    key = grammar_key(kind, grammar.normalized_lines(), tokenized=tokenized, **options)
+    if cache is not None:
+        compiled = cache.get(key)
+        if compiled is not None:
+            return compiled, True
+
+    metrics = BuildMetrics()
+    metrics.stages['read_grammar'] = time.perf_counter() - start
+    if base is not None and base.kind != kind:
+        base = None
+    with track_memory(metrics) if profile_memory else nullcontext():
+        if kind == 'll1':
+            compiled = compile_ll1(grammar, metrics=metrics, base=base, **options)
+        else:
+            compiled = compile_lr(grammar, metrics=metrics, progress=progress, base=base, **options)
+    compiled.key = key
+    if cache is not None:
+        cache.put(key, compiled)
+    return compiled, False
@@ -0,0 +1,190 @@
+from collections import deque
+
+EPSILON = 'ϵ'
+END = '$'
+
+
+# Productions split once and indexed by head and by body occurrence.
+# Terminals are numbered densely (in the given order, else in order of
+# appearance), followed by '$' and ϵ, so FIRST and FOLLOW sets are int
+# bitsets over those ids.
+class GrammarIndex:
+    def __init__(self, productions, nonterminals, terminals=None):
+        self.productions = list(productions)
+        self.by_head = {nt: [] for nt in nonterminals}
+        self.occurrences = {nt: [] for nt in nonterminals}
+        for p, (head, body) in enumerate(self.productions):
+            self.by_head[head].append(p)
+            for i, symbol in enumerate(body):
+                if symbol in self.occurrences:
+                    self.occurrences[symbol].append((p, i))
+
+        if terminals is None:
+            terminals = {}
+            for _, body in self.productions:
+                for symbol in body:
+                    if symbol not in self.by_head:
+                        terminals.setdefault(symbol)
+        self.terminals = [t for t in terminals if t not in (END, EPSILON)] + [END, EPSILON]
+        self.terminal_ids = {t: i for i, t in enumerate(self.terminals)}
+        self.end_bit = 1 << self.terminal_ids[END]
+        self.epsilon_bit = 1 << self.terminal_ids[EPSILON]
+        # Bodies with every terminal replaced by its bit
+        self.encoded = [
+            tuple(symbol if symbol in self.by_head else 1 << self.terminal_ids[symbol] for symbol in body)
+            for _, body in self.productions
+        ]
+
+    def symbols(self, bits):
+        result = set()
+        while bits:
+            low = bits & -bits
+            bits ^= low
+            result.add(self.terminals[low.bit_length() - 1])
+        return result
+
+
+# Non-terminals whose FIRST can differ from an earlier version of the grammar:
+# the changed ones and, transitively, every head with one of them in a body
+def first_dependents(index, changed):
+    dirty = {nt for nt in changed if nt in index.by_head}
+    queue = deque(dirty)
+    while queue:
+        nt = queue.popleft()
+        for p, _ in index.occurrences[nt]:
+            head = index.productions[p][0]
+            if head not in dirty:
+                dirty.add(head)
+                queue.append(head)
+    return dirty
+
+# Non-terminals whose FOLLOW can differ: those in the given productions, those
+# sharing a body with a symbol whose FIRST changed and, transitively, every
+# non-terminal in a body of one of them
+def follow_dependents(index, productions, first_changed):
+    dirty = {symbol for _, body in productions for symbol in body if symbol in index.by_head}
+    for nt in first_changed:
+        for p, _ in index.occurrences.get(nt, ()):
+            dirty.update(symbol for symbol in index.productions[p][1] if symbol in index.by_head)
+    queue = deque(dirty)
+    while queue:
+        head = queue.popleft()
+        for p in index.by_head[head]:
+            for symbol in index.productions[p][1]:
+                if symbol in index.by_head and symbol not in dirty:
+                    dirty.add(symbol)
+                    queue.append(symbol)
+    return dirty
+
+
+# A production is revisited only when FIRST of a symbol in its body grows.
+# Given the FIRST bits of an earlier version of the grammar and the dirty
+# non-terminals (closed under first_dependents), only those are recomputed.
+def compute_first_bits(index, previous=None, dirty=None):
+    first = {nt: 0 for nt in index.by_head}
+    if previous is None:
+        queue = deque(range(len(index.productions)))
+    else:
+        for nt in first:
+            if nt not in dirty:
+                first[nt] = previous.get(nt, 0)
+        queue = deque(p for nt in dirty for p in index.by_head[nt])
+    queued = [False] * len(index.productions)
+    for p in queue:
+        queued[p] = True
+
+    epsilon = index.epsilon_bit
+    productions = index.productions
+    encoded = index.encoded
+
+    while queue:
+        p = queue.popleft()
+        queued[p] = False
+        head = productions[p][0]
+        old = first[head]
+        new = old
+        for symbol in encoded[p]:
+            if symbol.__class__ is int:
+                new |= symbol
+                break
+            symbol_first = first[symbol]
+            new |= symbol_first & ~epsilon
+            if not symbol_first & epsilon:
+                break
+        else:
+            new |= epsilon
+        if new == old:
+            continue
+        first[head] = new
+        for q, _ in index.occurrences[head]:
+            if not queued[q]:
+                queued[q] = True
+                queue.append(q)
+
+    return first
+
+
+# FIRST(beta) is added once per occurrence, FOLLOW(head) flows along edges.
+# As with compute_first_bits, previous and dirty (closed under
+# follow_dependents) limit the work to the dirty non-terminals.
+def compute_follow_bits(index, first, start_symbol, previous=None, dirty=None):
+    epsilon = index.epsilon_bit
+    follow = {nt: 0 for nt in index.by_head}
+    edges = {nt: set() for nt in index.by_head}
+    if previous is None:
+        productions = range(len(index.productions))
+    else:
+        for nt in follow:
+            if nt not in dirty:
+                follow[nt] = previous.get(nt, 0)
+        productions = sorted({p for nt in dirty for p, _ in index.occurrences[nt]})
+    if previous is None or start_symbol in dirty:
+        follow[start_symbol] |= index.end_bit
+
+    for p in productions:
+        head = index.productions[p][0]
+        trailer = 0
+        nullable = True
+        for symbol in reversed(index.encoded[p]):
+            if symbol.__class__ is int:
+                trailer = symbol
+                nullable = False
+                continue
+            symbol_first = first[symbol]
+            if previous is None or symbol in dirty:
+                follow[symbol] |= trailer
+                if nullable and symbol != head:
+                    edges[head].add(symbol)
+            if symbol_first & epsilon:
+                trailer |= symbol_first & ~epsilon
+            else:
+                trailer = symbol_first
+                nullable = False
+
+    queue = deque(nt for nt in follow if edges[nt])
+    queued = set(queue)
+    while queue:
+        A = queue.popleft()
+        queued.discard(A)
+        for B in edges[A]:
+            merged = follow[B] | follow[A]
+            if merged != follow[B]:
+                follow[B] = merged
+                if B not in queued:
+                    queued.add(B)
+                    queue.append(B)
+
+    return follow
+
+
+# FIRST and FOLLOW as sets of symbols, for callers without a Grammar
+def compute_first_follow(productions, nonterminals, start_symbol=None):
+    index = GrammarIndex(productions, nonterminals)
+    if start_symbol is None:
+        start_symbol = next(iter(index.by_head))
+    first = compute_first_bits(index)
+    follow = compute_follow_bits(index, first, start_symbol)
+    return (
+        {nt: index.symbols(bits) for nt, bits in first.items()},
+        {nt: index.symbols(bits) for nt, bits in follow.items()}
+    )
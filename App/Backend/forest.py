@@ -0,0 +1,124 @@
+from array import array
+from tree import NO_NODE, ParseTree
+
+
+# Shared packed parse forest: every derivation of an ambiguous input in one
+# graph. Like ParseTree it is stored as parallel int arrays. A symbol node is
+# one (symbol, start, end) triple, shared by every derivation that uses it;
+# its packed nodes are the alternative ways it was derived, each a production
+# and the child symbol nodes of its body. Terminal nodes have no packed nodes.
+class ParseForest:
+    def __init__(self, grammar):
+        self.symbols = list(grammar.t_list.keys()) + ['$'] + list(grammar.nt_list.keys())
+        self.symbol_ids = {sym: i for i, sym in enumerate(self.symbols)}
+        self.symbol = array('i')
+        self.start = array('i')
+        self.end = array('i')
+        self.first_packed = array('i')
+        self.packed_prod = array('i')
+        self.packed_next = array('i')
+        self.packed_start = array('i')
+        self.packed_end = array('i')
+        self.children = array('i')
+        self.node_ids = {}
+        self.packed_keys = set()
+        # Whether some node has two derivations; cycles imply that too
+        self.ambiguous = False
+        self.root = NO_NODE
+
+    def __len__(self):
+        return len(self.symbol)
+
+    # The node of symbol over [start, end), created on first use
+    def node(self, symbol, start, end):
+        key = (symbol, start, end)
+        node = self.node_ids.get(key)
+        if node is None:
+            node = self.node_ids[key] = len(self.symbol)
+            self.symbol.append(self.symbol_ids[symbol])
+            self.start.append(start)
+            self.end.append(end)
+            self.first_packed.append(NO_NODE)
+        return node
+
+    # Adds a derivation of node by prod from children; False if it is known
+    def pack(self, node, prod, children):
+        key = (node, prod, tuple(children))
+        if key in self.packed_keys:
+            return False
+        self.packed_keys.add(key)
+        if self.first_packed[node] != NO_NODE:
+            self.ambiguous = True
+        self.packed_prod.append(prod)
+        self.packed_next.append(self.first_packed[node])
+        self.packed_start.append(len(self.children))
+        self.children.extend(children)
+        self.packed_end.append(len(self.children))
+        self.first_packed[node] = len(self.packed_prod) - 1
+        return True
+
+    # (production, children) of every derivation of node
+    def alternatives(self, node):
+        packed = self.first_packed[node]
+        while packed != NO_NODE:
+            yield self.packed_prod[packed], self.children[self.packed_start[packed]:self.packed_end[packed]].tolist()
+            packed = self.packed_next[packed]
+
+    # Number of parse trees under node (the root by default), or None when a
+    # cycle makes it infinite. Iterative, since long inputs nest deeply.
+    def count_trees(self, node=None):
+        node = self.root if node is None else node
+        if node == NO_NODE:
+            return 0
+        if not self.ambiguous:
+            return 1
+        first_packed, packed_next = self.first_packed, self.packed_next
+        packed_start, packed_end, children = self.packed_start, self.packed_end, self.children
+        counts = {}
+        on_path = set()
+        stack = [(node, False)]
+        while stack:
+            n, done = stack.pop()
+            packed = first_packed[n]
+            if done:
+                on_path.discard(n)
+                total = 0 if packed != NO_NODE else 1
+                while packed != NO_NODE:
+                    product = 1
+                    for i in range(packed_start[packed], packed_end[packed]):
+                        product *= counts[children[i]]
+                    total += product
+                    packed = packed_next[packed]
+                counts[n] = total
+                continue
+            if n in counts:
+                continue
+            on_path.add(n)
+            stack.append((n, True))
+            while packed != NO_NODE:
+                for i in range(packed_start[packed], packed_end[packed]):
+                    child = children[i]
+                    if child in on_path:
+                        return None
+                    if child not in counts:
+                        stack.append((child, False))
+                packed = packed_next[packed]
+        return counts[node]
+
+    # Spans are stored as in ParseTree, so they are remapped the same way
+    remap = ParseTree.remap
+
+    def to_dict(self):
+        return {
+            'symbols': self.symbols,
+            'root': self.root,
+            'symbol': self.symbol.tolist(),
+            'start': self.start.tolist(),
+            'end': self.end.tolist(),
+            'first_packed': self.first_packed.tolist(),
+            'packed_prod': self.packed_prod.tolist(),
+            'packed_next': self.packed_next.tolist(),
+            'packed_start': self.packed_start.tolist(),
+            'packed_end': self.packed_end.tolist(),
+            'children': self.children.tolist()
+        }
@@ -0,0 +1,173 @@
+from collections import deque
+from table import ACCEPT
+from forest import ParseForest
+
+
+# Graph-structured stack node: an LR state reached after the first level
+# input symbols. links maps each node below to the forest node of the symbol
+# between them; a state has a single accessing symbol, so one node per link.
+class StackNode:
+    __slots__ = ('state', 'level', 'links')
+
+    def __init__(self, state, level):
+        self.state = state
+        self.level = level
+        self.links = {}
+
+
+# (bottom node, forest nodes left to right) of every path of length links
+# down from node. With link = (upper, lower), only paths through that link.
+# A chain of single links, the usual case, is walked without recursion.
+def paths(node, length, link=None):
+    if link is None:
+        labels = [None] * length
+        while length and len(node.links) == 1:
+            for below, label in node.links.items():
+                length -= 1
+                labels[length] = label
+                node = below
+        if not length:
+            return [(node, labels)]
+        return [(bottom, found + labels[length:]) for bottom, found in branching_paths(node, length, None)]
+    return list(branching_paths(node, length, link))
+
+def branching_paths(node, length, link):
+    if length == 0:
+        if link is None:
+            yield node, []
+        return
+    for below, label in node.links.items():
+        rest = None if link is not None and link[0] is node and link[1] is below else link
+        for bottom, labels in branching_paths(below, length - 1, rest):
+            labels.append(label)
+            yield bottom, labels
+
+
+# Generalized LR: runs on the same table as the LR parsers, but follows every
+# action of a conflicting cell (table.alternatives). Stacks that share a state
+# at the same input position are merged into one GSS node, so deterministic
+# stretches of input cost what plain LR does. Every derivation goes into a
+# shared packed forest whose root spans the whole input.
+#
+# Reductions at one position run to a fixed point over a worklist of (node,
+# link) pairs: a node is first reduced along every path, and when a reduction
+# adds a link to a node that already exists, every node reduced so far redoes
+# the reductions whose path goes through the new link (Farshi's correction,
+# which handles epsilon productions and hidden left recursion).
+def recognize_glr(compiled, symbols, forest=None):
+    table = compiled.table
+    terminal_ids = table.terminal_ids
+    alternatives = table.alternatives
+    action_get = table.action.get
+    goto_get = table.goto.get
+    productions = table.productions
+    heads = table.prod_heads
+    lengths = table.prod_lengths
+    if forest is None:
+        forest = ParseForest(compiled.grammar)
+    tokens = iter(symbols)
+    frontier = {0: StackNode(0, 0)}
+    pos = 0
+    symbol = next(tokens, '$')
+
+    while True:
+        terminal = terminal_ids.get(symbol)
+        if terminal is None:
+            return {'success': False, 'message': f"Invalid symbol '{symbol}' in {in_states(frontier)}", 'position': pos, 'expected': expected_in(table, frontier)}
+
+        roots = set()
+        processed = []
+        if len(frontier) == 1:
+            # A lone stack is reduced in place, as the LR parser would, while
+            # its cells hold a single reduction along a single path
+            (top,) = frontier.values()
+            while (top.state, terminal) not in alternatives:
+                action = action_get(top.state, terminal)
+                if action >= 0 or action == ACCEPT:
+                    break
+                prod = -action - 1
+                found = paths(top, lengths[prod])
+                if len(found) != 1:
+                    break
+                u, labels = found[0]
+                target = goto_get(u.state, heads[prod]) - 1
+                if target in frontier:
+                    break
+                node = forest.node(productions[prod][0], u.level, pos)
+                forest.pack(node, prod, labels)
+                processed.append(top)
+                top = frontier[target] = StackNode(target, pos)
+                top.links[u] = node
+            work = deque([(top, None)])
+        else:
+            work = deque((v, None) for v in frontier.values())
+        while work:
+            v, link = work.popleft()
+            if link is None:
+                processed.append(v)
+            actions = alternatives.get((v.state, terminal))
+            if actions is None:
+                action = action_get(v.state, terminal)
+                actions = (action,) if action < 0 else ()
+            for action in actions:
+                if action > 0:
+                    continue
+                prod = -action - 1
+                if link is not None and not lengths[prod]:
+                    continue
+                for u, labels in paths(v, lengths[prod], link):
+                    if action == ACCEPT:
+                        roots.add(labels[0])
+                        continue
+                    node = forest.node(productions[prod][0], u.level, pos)
+                    forest.pack(node, prod, labels)
+                    target = goto_get(u.state, heads[prod]) - 1
+                    w = frontier.get(target)
+                    if w is None:
+                        w = frontier[target] = StackNode(target, pos)
+                        w.links[u] = node
+                        work.append((w, None))
+                    elif u not in w.links:
+                        w.links[u] = node
+                        work.extend((x, (w, u)) for x in processed)
+
+        if symbol == '$':
+            if not roots:
+                return {'success': False, 'message': f"No action for symbol '{symbol}' in {in_states(frontier)}", 'position': pos, 'expected': expected_in(table, frontier)}
+            forest.root = roots.pop()
+            return {'success': True, 'message': 'String accepted!', 'position': pos, 'parses': forest.count_trees()}
+
+        shifted = {}
+        leaf = None
+        for v in processed:
+            actions = alternatives.get((v.state, terminal))
+            if actions is None:
+                actions = (action_get(v.state, terminal),)
+            for action in actions:
+                if action <= 0:
+                    continue
+                if leaf is None:
+                    leaf = forest.node(symbol, pos, pos + 1)
+                w = shifted.get(action - 1)
+                if w is None:
+                    w = shifted[action - 1] = StackNode(action - 1, pos + 1)
+                w.links[v] = leaf
+        if not shifted:
+            return {'success': False, 'message': f"No action for symbol '{symbol}' in {in_states(frontier)}", 'position': pos, 'expected': expected_in(table, frontier)}
+        frontier = shifted
+        pos += 1
+        symbol = next(tokens, '$')
+
+
+# Terminals with an action in any of the stacks
+def expected_in(table, frontier):
+    bits = 0
+    for state in frontier:
+        bits |= table.expected_bits[state]
+    return table.terminal_symbols(bits)
+
+def in_states(frontier):
+    states = sorted(frontier)
+    if len(states) == 1:
+        return f"state {states[0]}"
+    return f"states {', '.join(map(str, states))}"
@@ -0,0 +1,263 @@
+from collections import Counter, OrderedDict
+import first_follow
+from metrics import stage
+
+EPSILON = first_follow.EPSILON
+
+
+class Terminal:
+    def __init__(self, symbol):
+        self.symbol = symbol
+    def __str__(self):
+        return self.symbol
+
+class NonTerminal:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.first = set()
+        self.follow = set()
+    def __str__(self):
+        return self.symbol
+    def add_first(self, symbols):
+        self.first |= set(symbols)
+    def add_follow(self, symbols):
+        self.follow |= set(symbols)
+
+
+EPSILONS = (EPSILON, 'ε')
+
+
+# Symbols, productions and the per-grammar indexes and caches the builders use.
+# Nothing here is shared between grammars, so each request owns its own.
+#
+# Production bodies are tuples of symbols. In the classic format every
+# character is a symbol and upper-case letters are non-terminals. In the
+# tokenized format symbols are separated by whitespace, every production
+# head is a non-terminal and everything else is a terminal:
+#
+#   %token id [a-zA-Z_][a-zA-Z0-9_]*
+#   %skip \s+
+#   Expr -> Expr + Term | Term
+#   Term -> id | ( Expr ) | 'if'
+class Grammar:
+    def __init__(self, lines=(), tokenized=False):
+        self.tokenized = tokenized
+        self.separator = ' ' if tokenized else ''
+        self.t_list = OrderedDict()
+        self.nt_list = OrderedDict()
+        self.production_list = []
+        self.rules = []
+        self.token_defs = []
+        self.skip_patterns = []
+        self.augmented = False
+        self.productions = []
+        self.prods_by_head = {}
+        self.terminal_ids = OrderedDict()
+        self.symbol_rank = {}
+        self.item_cache = {}
+        self.suffix_cache = {}
+        self.counters = {'closure': 0, 'goto': 0, 'reused': 0}
+        # FIRST/FOLLOW bitsets over terminal_ids, with ϵ one bit past '$'
+        self.first_bits = {}
+        self.follow_bits = {}
+        self.epsilon_bit = 0
+        if tokenized:
+            self.read_tokenized(lines)
+        else:
+            for line in lines:
+                self.add_production(line)
+
+    @classmethod
+    def from_text(cls, text, tokenized=False):
+        return cls(text.strip().split('\n'), tokenized)
+
+    def add_production(self, line):
+        line = line.strip().replace(' ', '')
+        if line == '':
+            return
+        self.production_list.append(line)
+
+        # ϵ (or ε) stands for the empty body, as in the tokenized format; the
+        # line keeps it for display
+        head, body = line.split('->')
+        body = tuple(symbol for symbol in body if symbol not in EPSILONS)
+        self.rules.append((head, body))
+
+        if head not in self.nt_list:
+            self.nt_list[head] = NonTerminal(head)
+
+        for symbol in body:
+            if not symbol.isupper():
+                if symbol not in self.t_list:
+                    self.t_list[symbol] = Terminal(symbol)
+            else:
+                if symbol not in self.nt_list:
+                    self.nt_list[symbol] = NonTerminal(symbol)
+
+    def read_tokenized(self, lines):
+        alternatives = []
+        for line in lines:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            if line.startswith('%token'):
+                _, name, pattern = line.split(None, 2)
+                self.token_defs.append((name, pattern))
+                continue
+            if line.startswith('%skip'):
+                self.skip_patterns.append(line.split(None, 1)[1])
+                continue
+
+            head, rhs = line.split('->', 1)
+            head = head.strip()
+            body = []
+            for symbol in rhs.split():
+                if symbol == '|':
+                    alternatives.append((head, body))
+                    body = []
+                elif len(symbol) > 2 and symbol[0] == symbol[-1] == "'":
+                    body.append(symbol[1:-1])
+                else:
+                    body.append(symbol)
+            alternatives.append((head, body))
+
+        heads = {head for head, _ in alternatives}
+        for head, body in alternatives:
+            body = tuple(symbol for symbol in body if symbol not in EPSILONS)
+            self.production_list.append(head + '->' + ' '.join(body))
+            self.rules.append((head, body))
+
+            if head not in self.nt_list:
+                self.nt_list[head] = NonTerminal(head)
+            for symbol in body:
+                if symbol in heads:
+                    if symbol not in self.nt_list:
+                        self.nt_list[symbol] = NonTerminal(symbol)
+                elif symbol not in self.t_list:
+                    self.t_list[symbol] = Terminal(symbol)
+
+    # Everything that defines the grammar, in a canonical form for cache keys
+    def normalized_lines(self):
+        lines = list(self.production_list)
+        lines += [f"%token {name} {pattern}" for name, pattern in self.token_defs]
+        lines += [f"%skip {pattern}" for pattern in self.skip_patterns]
+        return lines
+
+    @property
+    def start_symbol(self):
+        return next(iter(self.nt_list))
+
+    # Adds Z->S (or the next free letter; S' in the tokenized format) as
+    # production 0 and builds the LR indexes
+    def augment(self):
+        if self.augmented:
+            return
+        start = self.start_symbol
+        if self.tokenized:
+            head = start + "'"
+            while head in self.nt_list or head in self.t_list:
+                head += "'"
+        else:
+            head = next(chr(i) for i in range(ord('Z'), ord('A') - 1, -1) if chr(i) not in self.nt_list)
+        self.production_list.insert(0, head + '->' + start)
+        self.rules.insert(0, (head, (start,)))
+        self.augmented = True
+        self.index()
+
+    def index(self):
+        self.productions = list(self.rules)
+        self.prods_by_head = {nt: [] for nt in self.nt_list}
+        for p, (head, _) in enumerate(self.productions):
+            self.prods_by_head.setdefault(head, []).append(p)
+        self.terminal_ids = OrderedDict((sym, i) for i, sym in enumerate(list(self.t_list.keys()) + ['$']))
+        self.symbol_rank = {sym: i for i, sym in enumerate(list(self.nt_list.keys()) + list(self.t_list.keys()))}
+
+    def lookahead_symbols(self, bits):
+        return [sym for sym, i in self.terminal_ids.items() if bits >> i & 1]
+
+    def lookahead_bits(self, symbols):
+        bits = 0
+        for sym in symbols:
+            if sym in self.terminal_ids:
+                bits |= 1 << self.terminal_ids[sym]
+        return bits
+
+
+# FIRST/FOLLOW are defined on the grammar as written, without the augmented production
+def original_rules(grammar):
+    return grammar.rules[1:] if grammar.augmented else grammar.rules
+
+# Heads whose production bodies (with repeats) differ between two grammars
+def changed_heads(old_rules, new_rules):
+    old_bodies = Counter(old_rules)
+    new_bodies = Counter(new_rules)
+    return {head for head, _ in (old_bodies - new_bodies) + (new_bodies - old_bodies)}
+
+# An earlier build can be reused when terminals are numbered the same way and
+# the start symbol is unchanged
+def can_reuse(base, grammar):
+    return (
+        base is not None
+        and base.first_bits
+        and base.tokenized == grammar.tokenized
+        and list(base.t_list) == list(grammar.t_list)
+        and base.start_symbol == grammar.start_symbol
+    )
+
+# With an earlier version of the grammar as base, only the FIRST and FOLLOW
+# entries an edit can affect are recomputed. Returns the non-terminals whose
+# productions or FIRST changed, or None when everything was computed afresh.
+def compute_first_follow(grammar, metrics=None, base=None):
+    productions = original_rules(grammar)
+    index = first_follow.GrammarIndex(productions, grammar.nt_list, grammar.t_list)
+    changed = None
+    if can_reuse(base, grammar):
+        old_rules = original_rules(base)
+        heads = changed_heads(old_rules, productions)
+        with stage(metrics, 'first'):
+            first_dirty = first_follow.first_dependents(index, heads)
+            grammar.first_bits = first_follow.compute_first_bits(index, base.first_bits, first_dirty)
+        changed = heads | {nt for nt in first_dirty if grammar.first_bits[nt] != base.first_bits.get(nt)}
+        with stage(metrics, 'follow'):
+            edited = set(old_rules).symmetric_difference(productions)
+            follow_dirty = first_follow.follow_dependents(index, edited, changed)
+            grammar.follow_bits = first_follow.compute_follow_bits(
+                index, grammar.first_bits, grammar.start_symbol, base.follow_bits, follow_dirty
+            )
+        if metrics is not None:
+            metrics.count('first_recomputed', len(first_dirty))
+            metrics.count('follow_recomputed', len(follow_dirty))
+    else:
+        with stage(metrics, 'first'):
+            grammar.first_bits = first_follow.compute_first_bits(index)
+        with stage(metrics, 'follow'):
+            grammar.follow_bits = first_follow.compute_follow_bits(index, grammar.first_bits, grammar.start_symbol)
+    grammar.epsilon_bit = index.epsilon_bit
+    grammar.terminal_ids = OrderedDict((t, i) for i, t in enumerate(index.terminals[:-1]))
+    for nt in grammar.nt_list:
+        grammar.nt_list[nt].add_first(index.symbols(grammar.first_bits[nt]))
+        grammar.nt_list[nt].add_follow(index.symbols(grammar.follow_bits[nt]))
+    return changed
+
+# FIRST of a symbol sequence as a bitset over terminal_ids, plus whether the
+# whole sequence is nullable
+def sequence_first(grammar, symbols):
+    first_bits = grammar.first_bits
+    epsilon = grammar.epsilon_bit
+    bits = 0
+    for symbol in symbols:
+        symbol_first = first_bits.get(symbol)
+        if symbol_first is None:
+            return bits | 1 << grammar.terminal_ids[symbol], False
+        bits |= symbol_first & ~epsilon
+        if not symbol_first & epsilon:
+            return bits, False
+    return bits, True
+
+# FIRST(body[start:]) of production p, memoized per (p, start)
+def suffix_first(grammar, p, start):
+    key = (p, start)
+    cached = grammar.suffix_cache.get(key)
+    if cached is None:
+        cached = grammar.suffix_cache[key] = sequence_first(grammar, grammar.productions[p][1][start:])
+    return cached
@@ -0,0 +1,160 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from compiler import compile_grammar, compile_key
+
+# Seconds between progress reports from a worker
+PROGRESS_INTERVAL = 0.2
+# Finished jobs kept for /jobs/<id> after they complete
+JOB_HISTORY = 256
+
+
+# Called by the LR state builder; forwards the number of states discovered to
+# the parent at most once per interval, since every report is a round trip to
+# the manager process
+class ProgressReporter:
+    def __init__(self, progress, job_id):
+        self.progress = progress
+        self.job_id = job_id
+        self.last = 0.0
+
+    def __call__(self, states):
+        now = time.monotonic()
+        if now - self.last >= PROGRESS_INTERVAL:
+            self.last = now
+            self.progress[self.job_id] = states
+
+
+def run_job(job_id, progress, text, kind, tokenized, profile_memory, options):
+    progress[job_id] = 0
+    compiled, _ = compile_grammar(
+        text, kind,
+        tokenized=tokenized,
+        profile_memory=profile_memory,
+        progress=ProgressReporter(progress, job_id),
+        **options
+    )
+    if compiled.states is not None:
+        progress[job_id] = len(compiled.states)
+    return compiled
+
+
+class Job:
+    def __init__(self, key, kind):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.status = 'queued'
+        self.submitted = time.time()
+        self.finished = None
+        self.compiled = None
+        self.cached = False
+        self.error = None
+
+
+# Grammar builds run on a process pool. A job for a grammar and options that
+# is already queued, running or finished is returned instead of a new one, so
+# identical submissions share one build. Finished builds go into the grammar
+# cache as well.
+class JobManager:
+    def __init__(self, cache=None, processes=None, on_build=None):
+        self.cache = cache
+        self.processes = processes
+        self.on_build = on_build
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.by_key = {}
+        self.pool = None
+        self.manager = None
+        self.progress = None
+
+    # The pool and the manager holding progress counts start with the first job
+    def _start(self):
+        if self.pool is None:
+            self.manager = multiprocessing.Manager()
+            self.progress = self.manager.dict()
+            self.pool = ProcessPoolExecutor(max_workers=self.processes or None)
+
+    def _forget_finished(self):
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        for job in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self.jobs[job.id]
+            if self.by_key.get(job.key) is job:
+                del self.by_key[job.key]
+            if self.progress is not None:
+                self.progress.pop(job.id, None)
+
+    # Returns the job building this grammar, creating it if there is none
+    def submit(self, text, kind='lr', tokenized=False, profile_memory=False, **options):
+        key = compile_key(text, kind, tokenized, **options)
+        with self.lock:
+            job = self.by_key.get(key)
+            if job is not None and job.status != 'failed':
+                return job
+
+            job = Job(key, kind)
+            self.jobs[job.id] = job
+            self.by_key[key] = job
+            compiled = self.cache.get(key) if self.cache is not None else None
+            if compiled is not None:
+                job.status = 'done'
+                job.compiled = compiled
+                job.cached = True
+                job.finished = job.submitted
+                self._forget_finished()
+                return job
+
+            self._start()
+            future = self.pool.submit(run_job, job.id, self.progress, text, kind, tokenized, profile_memory, options)
+        future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job, future):
+        try:
+            compiled = future.result()
+        except Exception as e:
+            with self.lock:
+                job.status = 'failed'
+                job.error = str(e) or type(e).__name__
+                job.finished = time.time()
+                self._forget_finished()
+            return
+
+        if self.cache is not None:
+            self.cache.put(job.key, compiled)
+        if self.on_build is not None:
+            self.on_build(compiled)
+        with self.lock:
+            job.compiled = compiled
+            job.status = 'done'
+            job.finished = time.time()
+            self._forget_finished()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self, job):
+        states = None
+        if job.compiled is not None and job.compiled.states is not None:
+            states = len(job.compiled.states)
+        elif job.status != 'done' and self.progress is not None:
+            states = self.progress.get(job.id)
+        status = job.status
+        if status == 'queued' and states is not None:
+            status = 'running'
+        end = job.finished if job.finished is not None else time.time()
+        result = {
+            'id': job.id,
+            'status': status,
+            'kind': job.kind,
+            'states': states,
+            'elapsed': round(end - job.submitted, 3),
+            'cached': job.cached
+        }
+        if job.error is not None:
+            result['error'] = job.error
+        return result
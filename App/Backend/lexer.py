@@ -0,0 +1,343 @@
+from bisect import bisect_right
+
+MAX_CHAR = 0x10FFFF
+
+
+# ---- Regex syntax to an NFA (Thompson construction) ----
+#
+# Supported: literals, '.', escapes (\d \w \s \D \W \S \n \t \r and escaped
+# punctuation), classes [a-z_] and [^...], groups, '|', '*', '+' and '?'.
+# Counted repetition ({m,n}) and anchors (^ $) are rejected rather than read
+# as literals; escape them to match the characters.
+# Character sets are sorted lists of inclusive (lo, hi) code point ranges.
+
+DIGIT = [(48, 57)]
+WORD = [(48, 57), (65, 90), (95, 95), (97, 122)]
+SPACE = [(9, 13), (32, 32)]
+
+
+def negate(ranges):
+    result = []
+    lo = 0
+    for a, b in ranges:
+        if a > lo:
+            result.append((lo, a - 1))
+        lo = b + 1
+    if lo <= MAX_CHAR:
+        result.append((lo, MAX_CHAR))
+    return result
+
+
+def normalize(ranges):
+    result = []
+    for a, b in sorted(ranges):
+        if result and a <= result[-1][1] + 1:
+            result[-1] = (result[-1][0], max(result[-1][1], b))
+        else:
+            result.append((a, b))
+    return result
+
+
+ESCAPES = {
+    'd': DIGIT, 'w': WORD, 's': SPACE,
+    'D': negate(DIGIT), 'W': negate(WORD), 'S': negate(SPACE),
+    'n': [(10, 10)], 't': [(9, 9)], 'r': [(13, 13)],
+}
+
+
+class NFA:
+    def __init__(self):
+        self.epsilon = []
+        self.edges = []
+
+    def state(self):
+        self.epsilon.append([])
+        self.edges.append([])
+        return len(self.edges) - 1
+
+
+class RegexParser:
+    def __init__(self, nfa, pattern):
+        self.nfa = nfa
+        self.pattern = pattern
+        self.pos = 0
+
+    def error(self, message):
+        return ValueError(f"Bad pattern {self.pattern!r} at {self.pos}: {message}")
+
+    def peek(self):
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def take(self):
+        c = self.peek()
+        self.pos += 1
+        return c
+
+    def parse(self):
+        start, end = self.alternation()
+        if self.pos != len(self.pattern):
+            raise self.error("unexpected ')'")
+        return start, end
+
+    def alternation(self):
+        branches = [self.concatenation()]
+        while self.peek() == '|':
+            self.take()
+            branches.append(self.concatenation())
+        if len(branches) == 1:
+            return branches[0]
+        start, end = self.nfa.state(), self.nfa.state()
+        for s, e in branches:
+            self.nfa.epsilon[start].append(s)
+            self.nfa.epsilon[e].append(end)
+        return start, end
+
+    def concatenation(self):
+        start = end = self.nfa.state()
+        while self.peek() not in (None, '|', ')'):
+            s, e = self.repetition()
+            self.nfa.epsilon[end].append(s)
+            end = e
+        return start, end
+
+    def repetition(self):
+        s, e = self.atom()
+        while self.peek() in ('*', '+', '?'):
+            op = self.take()
+            start, end = self.nfa.state(), self.nfa.state()
+            self.nfa.epsilon[start].append(s)
+            self.nfa.epsilon[e].append(end)
+            if op in ('*', '?'):
+                self.nfa.epsilon[start].append(end)
+            if op in ('*', '+'):
+                self.nfa.epsilon[e].append(s)
+            s, e = start, end
+        return s, e
+
+    def atom(self):
+        c = self.take()
+        if c == '(':
+            s, e = self.alternation()
+            if self.take() != ')':
+                raise self.error("missing ')'")
+            return s, e
+        if c == '[':
+            ranges = self.char_class()
+        elif c == '.':
+            ranges = negate([(10, 10)])
+        elif c == '\\':
+            ranges = self.escape()
+        elif c is None or c in '*+?':
+            raise self.error("nothing to repeat" if c else "unexpected end")
+        elif c == '{':
+            raise self.error("counted repetition is not supported")
+        elif c in '^$':
+            raise self.error("anchors are not supported")
+        else:
+            ranges = [(ord(c), ord(c))]
+        start, end = self.nfa.state(), self.nfa.state()
+        self.nfa.edges[start].append((normalize(ranges), end))
+        return start, end
+
+    def escape(self):
+        c = self.take()
+        if c is None:
+            raise self.error("trailing backslash")
+        return ESCAPES.get(c, [(ord(c), ord(c))])
+
+    def char_class(self):
+        negated = self.peek() == '^'
+        if negated:
+            self.take()
+        ranges = []
+        first = True
+        while True:
+            c = self.take()
+            if c is None:
+                raise self.error("missing ']'")
+            if c == ']' and not first:
+                break
+            first = False
+            if c == '\\':
+                part = self.escape()
+                if len(part) != 1 or part[0][0] != part[0][1]:
+                    ranges.extend(part)
+                    continue
+                lo = part[0][0]
+            else:
+                lo = ord(c)
+            if self.peek() == '-' and self.pos + 1 < len(self.pattern) and self.pattern[self.pos + 1] != ']':
+                self.take()
+                hi = self.take()
+                if hi == '\\':
+                    hi = chr(self.escape()[0][0])
+                if lo > ord(hi):
+                    raise self.error("reversed range")
+                ranges.append((lo, ord(hi)))
+            else:
+                ranges.append((lo, lo))
+        ranges = normalize(ranges)
+        return negate(ranges) if negated else ranges
+
+
+def escape_literal(text):
+    return ''.join('\\' + c if c in '\\.[]()|*+?^$-{}' else c for c in text)
+
+
+# ---- NFA to DFA (subset construction) ----
+
+class Lexer:
+    # rules: (kind, pattern) in priority order; kind None marks a skip rule.
+    # Matching is longest-match first, then the earliest rule.
+    def __init__(self, rules):
+        nfa = NFA()
+        start = nfa.state()
+        accepting = {}
+        for priority, (kind, pattern) in enumerate(rules):
+            s, e = RegexParser(nfa, pattern).parse()
+            nfa.epsilon[start].append(s)
+            accepting[e] = priority
+        self.kinds_by_priority = [kind for kind, _ in rules]
+        self.build(nfa, start, accepting)
+
+    def build(self, nfa, start, accepting):
+        def eclose(states):
+            stack = list(states)
+            seen = set(states)
+            while stack:
+                for t in nfa.epsilon[stack.pop()]:
+                    if t not in seen:
+                        seen.add(t)
+                        stack.append(t)
+            return frozenset(seen)
+
+        first = eclose([start])
+        dfa_ids = {first: 0}
+        dfa_states = [first]
+        # Per DFA state: 128 ASCII targets plus sorted (lo, hi, target) ranges
+        self.ascii = []
+        self.ranges = []
+        self.accept = []
+
+        for closure in dfa_states:
+            edges = [edge for s in closure for edge in nfa.edges[s]]
+            points = sorted({a for ranges, _ in edges for a, _ in ranges} | {b + 1 for ranges, _ in edges for _, b in ranges})
+            ranges_out = []
+            for lo, nxt in zip(points, points[1:]):
+                hi = nxt - 1
+                targets = [t for ranges, t in edges if any(a <= lo and hi <= b for a, b in ranges)]
+                if not targets:
+                    continue
+                target_set = eclose(targets)
+                if target_set not in dfa_ids:
+                    dfa_ids[target_set] = len(dfa_states)
+                    dfa_states.append(target_set)
+                target = dfa_ids[target_set]
+                if ranges_out and ranges_out[-1][2] == target and ranges_out[-1][1] == lo - 1:
+                    ranges_out[-1] = (ranges_out[-1][0], hi, target)
+                else:
+                    ranges_out.append((lo, hi, target))
+
+            ascii_row = [-1] * 128
+            for lo, hi, target in ranges_out:
+                for c in range(lo, min(hi, 127) + 1):
+                    ascii_row[c] = target
+            self.ascii.append(ascii_row)
+            self.ranges.append(ranges_out)
+            priorities = [accepting[s] for s in closure if s in accepting]
+            self.accept.append(min(priorities) if priorities else -1)
+
+        self.range_starts = [[lo for lo, _, _ in r] for r in self.ranges]
+
+    def step(self, state, c):
+        code = ord(c)
+        if code < 128:
+            return self.ascii[state][code]
+        i = bisect_right(self.range_starts[state], code) - 1
+        if i >= 0:
+            lo, hi, target = self.ranges[state][i]
+            if code <= hi:
+                return target
+        return -1
+
+    # Longest match at pos: (end, priority, open), with (pos, -1) when nothing
+    # matches. open is True when the DFA was still running at the end of text,
+    # i.e. more input could extend the match.
+    def scan(self, text, pos):
+        state = 0
+        end, priority = pos, -1
+        i = pos
+        n = len(text)
+        ascii_rows = self.ascii
+        accept = self.accept
+        while i < n:
+            code = ord(text[i])
+            state = ascii_rows[state][code] if code < 128 else self.step(state, text[i])
+            if state < 0:
+                return end, priority, False
+            i += 1
+            if accept[state] >= 0:
+                end, priority = i, accept[state]
+        return end, priority, True
+
+    def match(self, text, pos):
+        end, priority, _ = self.scan(text, pos)
+        return end, priority
+
+    # Yields only the token kinds, without slicing lexemes out of the text.
+    # Start and end offsets are appended to offsets and ends when lists are
+    # given. A character no rule matches is yielded as itself, so the parser
+    # reports it as an invalid symbol at that position.
+    def kinds(self, text, offsets=None, ends=None):
+        pos = 0
+        n = len(text)
+        while pos < n:
+            end, priority = self.match(text, pos)
+            if priority < 0:
+                end = pos + 1
+                kind = text[pos]
+            else:
+                kind = self.kinds_by_priority[priority]
+            if kind is not None:
+                if offsets is not None:
+                    offsets.append(pos)
+                if ends is not None:
+                    ends.append(end)
+                yield kind
+            pos = end
+
+    # Lexes as much of a chunk as can be decided without seeing more input.
+    # Appends kinds (and their offsets) to the given lists and returns the
+    # offset where lexing stopped; the rest is carried into the next chunk.
+    def partial_kinds(self, text, kinds, offsets):
+        pos = 0
+        n = len(text)
+        kinds_by_priority = self.kinds_by_priority
+        while pos < n:
+            end, priority, open = self.scan(text, pos)
+            if open:
+                break
+            if priority < 0:
+                kinds.append(text[pos])
+                offsets.append(pos)
+                pos += 1
+                continue
+            kind = kinds_by_priority[priority]
+            if kind is not None:
+                kinds.append(kind)
+                offsets.append(pos)
+            pos = end
+        return pos
+
+
+DEFAULT_SKIP = r'\s+'
+
+
+# Literal terminals take priority over %token patterns of the same length,
+# so keywords win over an identifier pattern
+def build_lexer(grammar):
+    named = {name for name, _ in grammar.token_defs}
+    rules = [(t, escape_literal(t)) for t in sorted(grammar.t_list, key=len, reverse=True) if t not in named]
+    rules += list(grammar.token_defs)
+    rules += [(None, pattern) for pattern in (grammar.skip_patterns or [DEFAULT_SKIP])]
+    return Lexer(rules)
@@ -0,0 +1,39 @@
+from grammar import sequence_first
+
+
+# Builds the LL(1) table in one pass over the productions. The cells of a
+# production are FIRST(body), plus FOLLOW(head) when the body is nullable,
+# as one bitset; overlap with the cells already filled for the head is a
+# conflict. Every conflicting cell is reported in the returned list and the
+# first production written to a cell stays in the table.
+def compute_ll1_table(grammar):
+    terminals = list(grammar.terminal_ids)
+    table = {nt: dict.fromkeys(terminals, '') for nt in grammar.nt_list}
+    filled = dict.fromkeys(grammar.nt_list, 0)
+    conflicts = {}
+
+    for prod, (head, body) in zip(grammar.production_list, grammar.rules):
+        cells, nullable = sequence_first(grammar, body)
+        if nullable:
+            cells |= grammar.follow_bits[head]
+        clash = cells & filled[head]
+        filled[head] |= cells
+
+        row = table[head]
+        while cells:
+            low = cells & -cells
+            cells ^= low
+            terminal = terminals[low.bit_length() - 1]
+            if not low & clash:
+                row[terminal] = prod
+            elif (head, terminal) in conflicts:
+                conflicts[head, terminal]['productions'].append(prod)
+            else:
+                conflicts[head, terminal] = {
+                    'nonterminal': head,
+                    'terminal': terminal,
+                    'productions': [row[terminal], prod],
+                    'chosen': row[terminal]
+                }
+
+    return table, list(conflicts.values())
@@ -0,0 +1,339 @@
+from collections import OrderedDict, deque
+from operator import itemgetter
+from grammar import suffix_first
+from table import ParseTable, shift, reduce
+
+
+# LR(1) item: (production id, dot position, lookahead bitset over terminal_ids).
+# Items are interned per grammar by make_item, so equal items share one object.
+class Item(tuple):
+    __slots__ = ()
+    def __new__(cls, prod, dot, lookahead):
+        return tuple.__new__(cls, (prod, dot, lookahead))
+    def __getnewargs__(self):
+        return tuple(self)
+    prod = property(itemgetter(0))
+    dot = property(itemgetter(1))
+    lookahead = property(itemgetter(2))
+
+def make_item(grammar, prod, dot, lookahead):
+    key = (prod, dot, lookahead)
+    item = grammar.item_cache.get(key)
+    if item is None:
+        item = grammar.item_cache[key] = Item(prod, dot, lookahead)
+    return item
+
+def format_item(grammar, item):
+    head, body = grammar.productions[item.prod]
+    marked = grammar.separator.join(body[:item.dot] + ('.',) + body[item.dot:])
+    return f"{head}->{marked}, " + '|'.join(grammar.lookahead_symbols(item.lookahead))
+
+# Walks only newly added or grown items; lookaheads of a core are merged in place
+def closure(grammar, items):
+    productions = grammar.productions
+    prods_by_head = grammar.prods_by_head
+    grammar.counters['closure'] += 1
+    lookaheads = OrderedDict()
+    for item in items:
+        core = (item.prod, item.dot)
+        lookaheads[core] = lookaheads.get(core, 0) | item.lookahead
+
+    queue = deque(lookaheads)
+    queued = set(lookaheads)
+    while queue:
+        core = queue.popleft()
+        queued.discard(core)
+        p, dot = core
+        body = productions[p][1]
+        if dot == len(body) or body[dot] not in prods_by_head:
+            continue
+
+        lastr, nullable = suffix_first(grammar, p, dot + 1)
+        if nullable:
+            lastr |= lookaheads[core]
+
+        for q in prods_by_head[body[dot]]:
+            predicted = (q, 0)
+            old = lookaheads.get(predicted)
+            if old is not None and old | lastr == old:
+                continue
+            lookaheads[predicted] = lastr if old is None else old | lastr
+            if predicted not in queued:
+                queued.add(predicted)
+                queue.append(predicted)
+
+    return frozenset(make_item(grammar, p, dot, la) for (p, dot), la in lookaheads.items())
+
+# GOTO kernels for every symbol that appears after a dot, in one pass over the state
+def goto_kernels(grammar, items):
+    kernels = {}
+    for i in items:
+        body = grammar.productions[i.prod][1]
+        if i.dot < len(body):
+            kernels.setdefault(body[i.dot], []).append(make_item(grammar, i.prod, i.dot + 1, i.lookahead))
+    return kernels
+
+# Returns the states and the GOTO graph as one {symbol: state} dict per state.
+# States are keyed by kernel, so a known target is found without a closure.
+# progress, if given, is called with the number of states found so far.
+# reuse maps kernels to the closure and GOTO kernels of a state known from an
+# earlier build (see reusable_states); those are taken as they are.
+def calc_states(grammar, progress=None, reuse=None):
+    reuse = reuse or {}
+    start_kernel = frozenset([make_item(grammar, 0, 0, grammar.lookahead_bits('$'))])
+    states = []
+    kernels_of = []
+    transitions = []
+    state_ids = {}
+
+    def add_state(kernel):
+        state_ids[kernel] = len(states)
+        reused = reuse.get(kernel)
+        if reused is None:
+            states.append(closure(grammar, kernel))
+            kernels_of.append(None)
+        else:
+            states.append(reused[0])
+            kernels_of.append(reused[1])
+            grammar.counters['reused'] += 1
+        return state_ids[kernel]
+
+    add_state(start_kernel)
+    for s, state in enumerate(states):
+        if progress is not None:
+            progress(len(states))
+        edges = {}
+        kernels = kernels_of[s]
+        if kernels is None:
+            kernels = goto_kernels(grammar, state)
+            grammar.counters['goto'] += len(kernels)
+        for e in sorted(kernels, key=grammar.symbol_rank.get):
+            kernel = frozenset(kernels[e])
+            target = state_ids.get(kernel)
+            if target is None:
+                target = add_state(kernel)
+            edges[e] = target
+        transitions.append(edges)
+
+    return states, transitions
+
+# Closures and GOTO kernels of the states of an earlier build that are still
+# valid for grammar, keyed by kernel, for calc_states. A state is kept when all
+# its productions still exist and no non-terminal after a dot is in changed
+# (its productions or its FIRST differ); production ids are remapped.
+def reusable_states(grammar, base, states, transitions, changed):
+    prod_ids = {}
+    for p, production in enumerate(grammar.productions):
+        prod_ids.setdefault(production, deque()).append(p)
+    prod_map = [prod_ids[production].popleft() if prod_ids.get(production) else None for production in base.productions]
+    if prod_map[0] != 0:
+        return {}
+
+    def remap(items):
+        if all(prod_map[i.prod] == i.prod for i in items):
+            return items
+        return frozenset(make_item(grammar, prod_map[i.prod], i.dot, i.lookahead) for i in items)
+
+    kernels = {}
+    def kernel_of(s):
+        if s not in kernels:
+            kernels[s] = remap(frozenset(i for i in states[s] if i.dot or i.prod == 0))
+        return kernels[s]
+
+    # An item is still valid when its dot is past the last changed symbol
+    last_changed = []
+    for p, (_, body) in enumerate(base.productions):
+        if prod_map[p] is None:
+            last_changed.append(len(body) + 1)
+        else:
+            last_changed.append(max((i for i, symbol in enumerate(body) if symbol in changed), default=-1))
+
+    reuse = {}
+    for s, state in enumerate(states):
+        if all(last_changed[i.prod] < i.dot for i in state):
+            reuse[kernel_of(s)] = (remap(state), {e: kernel_of(t) for e, t in transitions[s].items()})
+    return reuse
+
+def lr0_closure(grammar, kernel):
+    items = list(kernel)
+    seen = set(kernel)
+    for p, dot in items:
+        body = grammar.productions[p][1]
+        if dot == len(body) or body[dot] not in grammar.prods_by_head:
+            continue
+        for q in grammar.prods_by_head[body[dot]]:
+            if (q, 0) not in seen:
+                seen.add((q, 0))
+                items.append((q, 0))
+    return items
+
+# LR(0) automaton as kernels of (production id, dot) cores plus the GOTO graph
+def calc_lr0_states(grammar, progress=None):
+    kernels = [((0, 0),)]
+    kernel_ids = {frozenset(kernels[0]): 0}
+    transitions = []
+
+    for kernel in kernels:
+        if progress is not None:
+            progress(len(kernels))
+        edges = {}
+        targets = {}
+        for p, dot in lr0_closure(grammar, kernel):
+            body = grammar.productions[p][1]
+            if dot < len(body):
+                targets.setdefault(body[dot], []).append((p, dot + 1))
+        grammar.counters['goto'] += len(targets)
+        for e in sorted(targets, key=grammar.symbol_rank.get):
+            key = frozenset(targets[e])
+            if key not in kernel_ids:
+                kernel_ids[key] = len(kernels)
+                kernels.append(tuple(targets[e]))
+            edges[e] = kernel_ids[key]
+        transitions.append(edges)
+
+    return kernels, transitions
+
+# States of the LR(0) automaton (lr0, from calc_lr0_states) as LR items whose
+# lookahead is what the item reduces on: FOLLOW of its head for SLR(1), every
+# terminal for LR(0). The augmented production reduces (accepts) on '$' only.
+def calc_slr_states(grammar, lr0, method='slr1'):
+    kernels, transitions = lr0
+    if method == 'lr0':
+        everything = (1 << len(grammar.terminal_ids)) - 1
+        lookaheads = {nt: everything for nt in grammar.nt_list}
+    else:
+        lookaheads = dict(grammar.follow_bits)
+    lookaheads[grammar.productions[0][0]] = grammar.lookahead_bits('$')
+
+    productions = grammar.productions
+    states = []
+    for kernel in kernels:
+        grammar.counters['closure'] += 1
+        states.append(frozenset(
+            make_item(grammar, p, dot, lookaheads[productions[p][0]]) for p, dot in lr0_closure(grammar, kernel)
+        ))
+    return states, transitions
+
+# LALR(1) states: lookaheads of LR(0) kernel items are found by closing each
+# kernel item under a dummy lookahead. Bits other than the dummy are generated
+# spontaneously; the dummy marks lookaheads propagated from the kernel item.
+# lr0 may pass in an LR(0) automaton that was already built.
+def calc_lalr_states(grammar, progress=None, lr0=None):
+    kernels, transitions = lr0 or calc_lr0_states(grammar, progress)
+    dummy = 1 << len(grammar.terminal_ids)
+    lookaheads = [dict.fromkeys(kernel, 0) for kernel in kernels]
+    lookaheads[0][(0, 0)] = grammar.lookahead_bits('$')
+    propagate = {}
+
+    for s, kernel in enumerate(kernels):
+        for core in kernel:
+            for item in closure(grammar, [make_item(grammar, core[0], core[1], dummy)]):
+                body = grammar.productions[item.prod][1]
+                if item.dot == len(body):
+                    continue
+                t = transitions[s][body[item.dot]]
+                target = (item.prod, item.dot + 1)
+                lookaheads[t][target] |= item.lookahead & ~dummy
+                if item.lookahead & dummy:
+                    propagate.setdefault((s, core), []).append((t, target))
+
+    queue = deque((s, core) for s, kernel in enumerate(kernels) for core in kernel)
+    queued = set(queue)
+    while queue:
+        source = queue.popleft()
+        queued.discard(source)
+        la = lookaheads[source[0]][source[1]]
+        for t, target in propagate.get(source, ()):
+            old = lookaheads[t][target]
+            if old | la == old:
+                continue
+            lookaheads[t][target] = old | la
+            if (t, target) not in queued:
+                queued.add((t, target))
+                queue.append((t, target))
+
+    states = [closure(grammar, [make_item(grammar, p, dot, la) for (p, dot), la in kernel_la.items()]) for kernel_la in lookaheads]
+    return states, transitions
+
+# Kernel items first, then closure items in production order
+def state_items(state):
+    return sorted(state, key=lambda item: (item.dot == 0 and item.prod != 0, item.prod, item.dot))
+
+# Whether build_parsing_table would find no conflict, without building the
+# table: per state, no two reductions and no reduction and shift share a terminal
+def conflict_free(grammar, states, transitions):
+    productions = grammar.productions
+    terminal_ids = grammar.terminal_ids
+    for state, edges in zip(states, transitions):
+        taken = 0
+        for symbol in edges:
+            if symbol in terminal_ids:
+                taken |= 1 << terminal_ids[symbol]
+        for item in state:
+            if item.dot == len(productions[item.prod][1]):
+                if item.lookahead & taken:
+                    return False
+                taken |= item.lookahead
+    return True
+
+# Fills ACTION/GOTO in one pass over the automaton. Conflicting cells are
+# appended to conflicts (when a list is given) with the items involved, and
+# resolved the usual way: shift wins over reduce, the earlier production wins
+# a reduce/reduce conflict. Every action of a conflicting cell is kept in
+# table.alternatives, and the terminals with an action in table.expected_bits.
+def build_parsing_table(grammar, states, transitions, conflicts=None):
+    table = ParseTable(grammar.terminal_ids.keys(), grammar.nt_list.keys(), len(states), grammar.productions)
+    terminals = table.terminals
+
+    for idx, state in enumerate(states):
+        reductions = {}
+        expected = 0
+        for item in state:
+            if item.dot != len(grammar.productions[item.prod][1]):
+                continue
+            expected |= item.lookahead
+            bits = item.lookahead
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                reductions.setdefault(low.bit_length() - 1, []).append(item)
+
+        edges = transitions[idx]
+        for t, items in sorted(reductions.items()):
+            if len(items) > 1:
+                items.sort(key=lambda item: item.prod)
+            shifts = terminals[t] in edges
+            if shifts or len(items) > 1:
+                actions = [reduce(item.prod) for item in items]
+                if shifts:
+                    actions.insert(0, shift(edges[terminals[t]]))
+                table.alternatives[(idx, t)] = tuple(actions)
+                if conflicts is not None:
+                    conflicts.append(lr_conflict(grammar, idx, state, terminals[t], items, edges.get(terminals[t]) if shifts else None))
+            if not shifts:
+                table.action.set(idx, t, reduce(items[0].prod))
+
+        for next_symbol, v in edges.items():
+            if next_symbol in grammar.t_list:
+                table.action.set(idx, grammar.terminal_ids[next_symbol], shift(v))
+                expected |= 1 << grammar.terminal_ids[next_symbol]
+            else:
+                table.goto.set(idx, table.nonterminal_ids[next_symbol], v + 1)
+        table.expected_bits[idx] = expected
+    return table
+
+def lr_conflict(grammar, idx, state, symbol, reducers, target):
+    actions = [f"r{item.prod}" for item in reducers]
+    involved = list(reducers)
+    if target is not None:
+        actions.insert(0, f"s{target}")
+        involved += [item for item in state_items(state)
+                     if item.dot < len(grammar.productions[item.prod][1]) and grammar.productions[item.prod][1][item.dot] == symbol]
+    return {
+        'state': idx,
+        'symbol': symbol,
+        'type': 'shift/reduce' if target is not None else 'reduce/reduce',
+        'actions': actions,
+        'chosen': actions[0],
+        'items': [format_item(grammar, item) for item in involved]
+    }
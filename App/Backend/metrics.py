@@ -0,0 +1,138 @@
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+
+# Measurements of one grammar build: wall time per stage, counters such as
+# closure and goto calls, and optionally the peak traced memory
+class BuildMetrics:
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.counts = OrderedDict()
+        self.peak_memory = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def result(self, extra_stages=None):
+        stages = OrderedDict(self.stages)
+        stages.update(extra_stages or {})
+        return {
+            'stages_ms': {name: round(seconds * 1e3, 3) for name, seconds in stages.items()},
+            'total_ms': round(sum(stages.values()) * 1e3, 3),
+            'counts': dict(self.counts),
+            'peak_memory_bytes': self.peak_memory
+        }
+
+
+def stage(metrics, name):
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+# tracemalloc is process-wide, so only one build at a time traces memory; a
+# build that overlaps another traced build reports no peak
+memory_lock = threading.Lock()
+
+
+@contextmanager
+def track_memory(metrics):
+    if tracemalloc.is_tracing() or not memory_lock.acquire(blocking=False):
+        yield
+        return
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        metrics.peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        memory_lock.release()
+
+
+METRIC_HELP = OrderedDict([
+    ('grammar_builds_total', ('counter', 'Grammars compiled, excluding cache hits')),
+    ('grammar_build_stage_seconds_total', ('counter', 'Wall time spent in each build stage')),
+    ('grammar_build_closure_calls_total', ('counter', 'LR closure computations')),
+    ('grammar_build_goto_calls_total', ('counter', 'LR goto computations')),
+    ('grammar_build_states_total', ('counter', 'LR states built')),
+    ('grammar_build_items_total', ('counter', 'LR items in built states')),
+    ('grammar_build_peak_memory_bytes', ('gauge', 'Peak traced memory of the last build that tracked memory')),
+    ('parse_requests_total', ('counter', 'Inputs parsed, by parser and outcome')),
+    ('parse_seconds_total', ('counter', 'Wall time spent parsing')),
+    ('grammar_cache_hits_total', ('counter', 'Grammar cache hits')),
+    ('grammar_cache_misses_total', ('counter', 'Grammar cache misses')),
+    ('grammar_cache_entries', ('gauge', 'Compiled grammars held in memory')),
+])
+
+
+# Process-wide counters rendered in the Prometheus text format
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = OrderedDict()
+
+    def add(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+
+    def render(self):
+        with self.lock:
+            values = list(self.values.items())
+        lines = []
+        for name, (kind, text) in METRIC_HELP.items():
+            samples = [(labels, value) for (n, labels), value in values if n == name]
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# The build is already in the cache, where other requests can reach it, so
+# its stages are read from a copy
+def record_build(compiled):
+    metrics = compiled.metrics
+    REGISTRY.add('grammar_builds_total', kind=compiled.kind, method=compiled.method or '')
+    for name, seconds in list(metrics.stages.items()):
+        REGISTRY.add('grammar_build_stage_seconds_total', seconds, stage=name)
+    REGISTRY.add('grammar_build_closure_calls_total', metrics.counts.get('closure_calls', 0))
+    REGISTRY.add('grammar_build_goto_calls_total', metrics.counts.get('goto_calls', 0))
+    REGISTRY.add('grammar_build_states_total', metrics.counts.get('states', 0))
+    REGISTRY.add('grammar_build_items_total', metrics.counts.get('items', 0))
+    if metrics.peak_memory is not None:
+        REGISTRY.set('grammar_build_peak_memory_bytes', metrics.peak_memory)
+
+
+# seconds may be None when parses are not timed one by one (batches)
+def record_parse(parser, seconds, success):
+    REGISTRY.add('parse_requests_total', parser=parser, result='accepted' if success else 'rejected')
+    if seconds is not None:
+        REGISTRY.add('parse_seconds_total', seconds, parser=parser)
+
+
+def render_metrics(cache=None):
+    if cache is not None:
+        REGISTRY.set('grammar_cache_hits_total', cache.hits)
+        REGISTRY.set('grammar_cache_misses_total', cache.misses)
+        REGISTRY.set('grammar_cache_entries', len(cache.entries))
+    return REGISTRY.render()
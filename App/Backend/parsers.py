@@ -0,0 +1,581 @@
+from table import ERROR, ACCEPT
+from tree import ParseTree, NO_NODE
+from forest import ParseForest
+from glr import recognize_glr
+
+# The parsers take any iterable of terminal symbols. A string in the classic
+# grammar format is its own symbol sequence; for tokenized grammars the text
+# goes through the compiled lexer, which yields token kinds only.
+
+# When a ParseTree is passed the parsers also build the parse tree: LR adds a
+# node on every shift and reduction, LL(1) adds the children of a non-terminal
+# when it is expanded. Spans are filled in as input is consumed.
+
+# Every LR parser reads a symbol through lr_step, on a stack of state ids: the
+# reductions it triggers are made, calling on_reduce(prod) after each pops its
+# body, and then it is shifted. Returns the last action and an error message.
+# ERROR comes with the message for the symbol; a reduction that finds the
+# stack too short or no GOTO returns its own action and message.
+#
+# On a cyclic grammar (or LR(0), where every terminal is a lookahead) the
+# reductions can go round without reading input, e.g. S->ϵ with GOTO back to
+# the same state. A symbol that takes more reductions than the number of
+# states times the stack depth (plus the number of states, for ϵ chains that
+# grow the stack) is reported as an ERROR.
+def lr_step(table, stack, symbol, production_list, on_reduce=None):
+    terminal = table.terminal_ids.get(symbol)
+    if terminal is None:
+        return ERROR, f"Invalid symbol '{symbol}' in state {stack[-1]}"
+    action_get = table.action.get
+    action = action_get(stack[-1], terminal)
+    if action > 0:
+        stack.append(action - 1)
+        return action, None
+
+    goto_get = table.goto.get
+    heads = table.prod_heads
+    lengths = table.prod_lengths
+    limit = table.n_states * (len(stack) + table.n_states)
+    reductions = 0
+    while True:
+        if action > 0:
+            stack.append(action - 1)
+            return action, None
+        elif action == ACCEPT:
+            return action, None
+        elif action == ERROR:
+            return action, f"No action for symbol '{symbol}' in state {stack[-1]}"
+        reductions += 1
+        if reductions > limit:
+            return ERROR, f"Reductions loop on symbol '{symbol}' in state {stack[-1]}"
+        prod = -action - 1
+        size = lengths[prod]
+        if size:
+            if len(stack) <= size:
+                return action, f"Stack underflow when reducing by {production_list[prod]}"
+            del stack[-size:]
+        if on_reduce is not None:
+            on_reduce(prod)
+        target = goto_get(stack[-1], heads[prod])
+        if not target:
+            return action, f"No goto for {table.productions[prod][0]} in state {stack[-1]}"
+        stack.append(target - 1)
+        action = action_get(stack[-1], terminal)
+
+# Full step-by-step trace, only built when a caller asks for it. The stack is
+# shown with the grammar symbols between the states.
+def trace_slr(compiled, symbols, tree=None):
+    parsing_table = compiled.table
+    production_list = compiled.grammar.production_list
+    sep = compiled.grammar.separator
+    symbols = list(symbols) + ['$']
+    pos = 0
+    stack = [0]
+    read = []
+    nodes = []
+    parse_steps = []
+
+    def shown():
+        items = [str(stack[0])]
+        for symbol, state in zip(read, stack[1:]):
+            items.append(symbol)
+            items.append(str(state))
+        return ' '.join(items)
+
+    def on_reduce(prod):
+        head, body = parsing_table.productions[prod]
+        if tree is not None:
+            reduce_node(tree, nodes, head, len(body), pos)
+        # shown once the body is popped, before the GOTO is pushed
+        if body:
+            del read[-len(body):]
+        parse_steps.append({
+            'stack': shown(),
+            'input': sep.join(symbols[pos:]),
+            'action': f"Reduce by {production_list[prod]}" + ('' if body else ' (epsilon)')
+        })
+        read.append(head)
+
+    parse_steps.append({
+        'stack': shown(),
+        'input': sep.join(symbols[pos:]),
+        'action': 'Initial'
+    })
+
+    while True:
+        current_symbol = symbols[pos]
+        action, message = lr_step(parsing_table, stack, current_symbol, production_list, on_reduce)
+
+        if action == ERROR:
+            return {
+                'success': False,
+                'message': message,
+                'steps': parse_steps,
+                'position': pos,
+                'expected': compiled.expected(stack[-1])
+            }
+
+        if message is not None:
+            return {
+                'success': False,
+                'message': message,
+                'steps': parse_steps,
+                'position': pos
+            }
+
+        if action == ACCEPT:
+            if tree is not None:
+                tree.root = nodes[-1]
+            parse_steps.append({
+                'stack': shown(),
+                'input': sep.join(symbols[pos:]),
+                'action': 'Accept'
+            })
+            return {
+                'success': True,
+                'message': 'String accepted!',
+                'steps': parse_steps,
+                'position': pos
+            }
+
+        # Shift
+        if tree is not None:
+            nodes.append(tree.add(current_symbol, pos, pos + 1))
+        read.append(current_symbol)
+        pos += 1
+
+        parse_steps.append({
+            'stack': shown(),
+            'input': sep.join(symbols[pos:]),
+            'action': f"Shift to state {stack[-1]}"
+        })
+
+def trace_ll1(compiled, symbols, tree=None):
+    parsing_table = compiled.table
+    expansions = compiled.expansions
+    t_list, nt_list = compiled.grammar.t_list, compiled.grammar.nt_list
+    sep = compiled.grammar.separator
+    start_symbol = compiled.grammar.start_symbol
+    symbols = list(symbols) + ['$']
+    pos = 0
+    stack = ['$', start_symbol]
+    nodes = [NO_NODE, tree.add(start_symbol, 0, 0) if tree is not None else NO_NODE]
+    parse_steps = []
+
+    parse_steps.append({
+        'stack': ' '.join(stack),
+        'input': sep.join(symbols[pos:]),
+        'action': 'Initial'
+    })
+
+    while True:
+        if not stack:
+            return {
+                'success': False,
+                'message': 'Stack is empty',
+                'steps': parse_steps,
+                'position': pos
+            }
+
+        top = stack[-1]
+        current_input = symbols[pos]
+
+        if top == '$' and current_input == '$':
+            if tree is not None:
+                tree.root = 0
+                tree.close_spans()
+            parse_steps.append({
+                'stack': ' '.join(stack),
+                'input': sep.join(symbols[pos:]),
+                'action': 'Accept'
+            })
+            return {
+                'success': True,
+                'message': 'String accepted!',
+                'steps': parse_steps,
+                'position': pos
+            }
+
+        elif top in t_list or top == '$':
+            if top == current_input:
+                stack.pop()
+                if tree is not None:
+                    match_node(tree, nodes, pos)
+                pos += 1
+                parse_steps.append({
+                    'stack': ' '.join(stack),
+                    'input': sep.join(symbols[pos:]),
+                    'action': f"Match '{top}'"
+                })
+            else:
+                return {
+                    'success': False,
+                    'message': f"Expected '{top}', found '{current_input}'",
+                    'steps': parse_steps,
+                    'position': pos,
+                    'expected': compiled.expected(top)
+                }
+
+        elif top in nt_list:
+            production = parsing_table[top].get(current_input, '')
+            if not production:
+                return {
+                    'success': False,
+                    'message': f"No production for {top} on '{current_input}'",
+                    'steps': parse_steps,
+                    'position': pos,
+                    'expected': compiled.expected(top)
+                }
+
+            stack.pop()
+            # Push symbols in reverse order
+            stack.extend(expansions[top][current_input])
+            if tree is not None:
+                expand_node(tree, nodes, expansions[top][current_input], pos)
+
+            parse_steps.append({
+                'stack': ' '.join(stack),
+                'input': sep.join(symbols[pos:]),
+                'action': f"Apply {production}"
+            })
+
+        else:
+            return {
+                'success': False,
+                'message': f"Unknown symbol '{top}' on stack",
+                'steps': parse_steps,
+                'position': pos
+            }
+
+# Recognizer-only LR parse: a cursor over the symbol stream and a stack of
+# state ids, with nothing allocated per step
+def recognize_slr(compiled, symbols, tree=None):
+    table = compiled.table
+    production_list = compiled.grammar.production_list
+    tokens = iter(symbols)
+    stack = [0]
+    nodes = []
+    on_reduce = None
+    pos = 0
+    symbol = next(tokens, '$')
+
+    if tree is not None:
+        def on_reduce(prod):
+            reduce_node(tree, nodes, table.productions[prod][0], table.prod_lengths[prod], pos)
+
+    while True:
+        action, message = lr_step(table, stack, symbol, production_list, on_reduce)
+        if message is not None:
+            if action == ERROR:
+                return {'success': False, 'message': message, 'position': pos, 'expected': compiled.expected(stack[-1])}
+            return {'success': False, 'message': message, 'position': pos}
+        if action == ACCEPT:
+            if tree is not None:
+                tree.root = nodes[-1]
+            return {'success': True, 'message': 'String accepted!', 'position': pos}
+        if tree is not None:
+            nodes.append(tree.add(symbol, pos, pos + 1))
+        pos += 1
+        symbol = next(tokens, '$')
+
+def recognize_ll1(compiled, symbols, tree=None):
+    expansions = compiled.expansions
+    t_list = compiled.grammar.t_list
+    tokens = iter(symbols)
+    stack = ['$', compiled.grammar.start_symbol]
+    nodes = [NO_NODE, tree.add(stack[1], 0, 0) if tree is not None else NO_NODE]
+    pos = 0
+    current = next(tokens, '$')
+
+    while True:
+        top = stack[-1]
+
+        if top == '$' and current == '$':
+            if tree is not None:
+                tree.root = 0
+                tree.close_spans()
+            return {'success': True, 'message': 'String accepted!', 'position': pos}
+        elif top in t_list or top == '$':
+            if top != current:
+                return {'success': False, 'message': f"Expected '{top}', found '{current}'", 'position': pos, 'expected': compiled.expected(top)}
+            stack.pop()
+            if tree is not None:
+                match_node(tree, nodes, pos)
+            pos += 1
+            current = next(tokens, '$')
+        elif top in expansions:
+            body = expansions[top].get(current)
+            if body is None:
+                return {'success': False, 'message': f"No production for {top} on '{current}'", 'position': pos, 'expected': compiled.expected(top)}
+            stack.pop()
+            stack.extend(body)
+            if tree is not None:
+                expand_node(tree, nodes, body, pos)
+        else:
+            return {'success': False, 'message': f"Unknown symbol '{top}' on stack", 'position': pos}
+
+# The recovering parsers run after a failed parse when every error is wanted.
+# Instead of stopping they record the error, with the terminals that were
+# expected there, and resynchronise. Until a token is read normally again no
+# new error is reported, so one mistake is not reported once per token that
+# is skipped. They build no tree: the input has errors.
+
+def recovery_result(errors, pos):
+    if not errors:
+        return {'success': True, 'message': 'String accepted!', 'position': pos, 'errors': errors}
+    return {'success': False, 'message': errors[0]['message'], 'position': errors[0]['position'], 'errors': errors}
+
+def error_entry(message, pos, expected):
+    return {'message': message, 'position': pos, 'expected': expected}
+
+# Panic mode for LR: the stack is popped to the nearest state with a GOTO on
+# some non-terminal after which the lookahead has an action, and that GOTO is
+# pushed as though the non-terminal had been read. When there is none, or
+# the last recovery was at the same position, the lookahead is discarded.
+# A reduction loop can leave the stack much deeper than it was, so it is put
+# back as it was before the symbol.
+def recover_slr(compiled, symbols, tree=None):
+    table = compiled.table
+    terminal_ids = table.terminal_ids
+    production_list = compiled.grammar.production_list
+    tokens = iter(symbols)
+    stack = [0]
+    errors = []
+    recovering = False
+    recovered_at = -1
+    pos = 0
+    symbol = next(tokens, '$')
+
+    while True:
+        before = stack[:]
+        action, message = lr_step(table, stack, symbol, production_list)
+        if action == ACCEPT:
+            return recovery_result(errors, pos)
+        elif message is None:
+            recovering = False
+            pos += 1
+            symbol = next(tokens, '$')
+        elif action != ERROR:
+            errors.append(error_entry(message, pos, []))
+            return recovery_result(errors, pos)
+        else:
+            if message.startswith('Reductions loop'):
+                stack[:] = before
+            if not recovering:
+                errors.append(error_entry(message, pos, compiled.expected(stack[-1])))
+                recovering = True
+            terminal = terminal_ids.get(symbol)
+            found = None
+            if terminal is not None and pos != recovered_at:
+                found = recovery_state(table, stack, terminal)
+            if found is not None:
+                depth, target = found
+                del stack[depth + 1:]
+                stack.append(target)
+                recovered_at = pos
+            elif symbol == '$':
+                return recovery_result(errors, pos)
+            else:
+                pos += 1
+                symbol = next(tokens, '$')
+
+# (stack depth, state to push) of the nearest recovery point for terminal
+def recovery_state(table, stack, terminal):
+    action_get = table.action.get
+    goto_get = table.goto.get
+    for depth in range(len(stack) - 1, -1, -1):
+        for nt in range(len(table.nonterminals)):
+            target = goto_get(stack[depth], nt)
+            if target and action_get(target - 1, terminal) != ERROR:
+                return depth, target - 1
+    return None
+
+# Panic mode for LL(1), synchronising on FOLLOW: a non-terminal with no
+# production for the lookahead is popped when the lookahead can follow it,
+# otherwise the lookahead is discarded. A terminal that does not match is
+# popped, as though it had been inserted. Input left over once the stack is
+# empty is skipped up to a token in FIRST of the start symbol, which restarts it.
+def recover_ll1(compiled, symbols, tree=None):
+    expansions = compiled.expansions
+    nt_list = compiled.grammar.nt_list
+    t_list = compiled.grammar.t_list
+    start = compiled.grammar.start_symbol
+    tokens = iter(symbols)
+    stack = ['$', start]
+    errors = []
+    recovering = False
+    pos = 0
+    current = next(tokens, '$')
+
+    while True:
+        top = stack[-1]
+
+        if top == '$' and current == '$':
+            return recovery_result(errors, pos)
+        elif top in t_list or top == '$':
+            if top == current:
+                stack.pop()
+                recovering = False
+                pos += 1
+                current = next(tokens, '$')
+                continue
+            if not recovering:
+                errors.append(error_entry(f"Expected '{top}', found '{current}'", pos, compiled.expected(top)))
+                recovering = True
+            if top != '$':
+                stack.pop()
+            elif current in nt_list[start].first:
+                stack.append(start)
+            else:
+                pos += 1
+                current = next(tokens, '$')
+        elif top in expansions:
+            body = expansions[top].get(current)
+            if body is not None:
+                stack.pop()
+                stack.extend(body)
+                continue
+            if not recovering:
+                errors.append(error_entry(f"No production for {top} on '{current}'", pos, compiled.expected(top)))
+                recovering = True
+            if current == '$' or current in nt_list[top].follow:
+                stack.pop()
+            else:
+                pos += 1
+                current = next(tokens, '$')
+        else:
+            errors.append(error_entry(f"Unknown symbol '{top}' on stack", pos, []))
+            return recovery_result(errors, pos)
+
+# Autocompletion: the prefix parsers read input that may stop short of a
+# sentence. When it runs out, the terminals that can come next are looked up
+# for the top of the stack; no reduction has been made on a lookahead yet, so
+# the LR state there is the one reached by the last shift.
+def prefix_slr(compiled, symbols, tree=None):
+    table = compiled.table
+    production_list = compiled.grammar.production_list
+    tokens = iter(symbols)
+    stack = [0]
+    pos = 0
+    symbol = next(tokens, None)
+
+    while symbol is not None:
+        action, message = lr_step(table, stack, symbol, production_list)
+        if action == ACCEPT:
+            return {'success': True, 'message': 'String accepted!', 'position': pos, 'expected': []}
+        elif action == ERROR:
+            return {'success': False, 'message': message, 'position': pos, 'expected': compiled.expected(stack[-1])}
+        elif message is not None:
+            return {'success': False, 'message': message, 'position': pos}
+        pos += 1
+        symbol = next(tokens, None)
+    return {'success': True, 'message': 'Prefix accepted', 'position': pos, 'expected': compiled.expected(stack[-1])}
+
+# For LL(1) the row of a nullable non-terminal on top also holds FOLLOW of it,
+# so what can come next may be over-reported, never missed
+def prefix_ll1(compiled, symbols, tree=None):
+    expansions = compiled.expansions
+    t_list = compiled.grammar.t_list
+    tokens = iter(symbols)
+    stack = ['$', compiled.grammar.start_symbol]
+    pos = 0
+    current = next(tokens, None)
+
+    while current is not None:
+        top = stack[-1]
+        if top == '$' and current == '$':
+            return {'success': True, 'message': 'String accepted!', 'position': pos, 'expected': []}
+        elif top in t_list or top == '$':
+            if top != current:
+                return {'success': False, 'message': f"Expected '{top}', found '{current}'", 'position': pos, 'expected': compiled.expected(top)}
+            stack.pop()
+            pos += 1
+            current = next(tokens, None)
+        else:
+            body = expansions[top].get(current)
+            if body is None:
+                return {'success': False, 'message': f"No production for {top} on '{current}'", 'position': pos, 'expected': compiled.expected(top)}
+            stack.pop()
+            stack.extend(body)
+    return {'success': True, 'message': 'Prefix accepted', 'position': pos, 'expected': compiled.expected(stack[-1])}
+
+# Pops the children of a reduction off the node stack and pushes their parent
+def reduce_node(tree, nodes, head, size, pos):
+    if not size:
+        nodes.append(tree.add(head, pos, pos))
+        return
+    children = nodes[len(nodes) - size:]
+    del nodes[len(nodes) - size:]
+    node = tree.add(head, tree.start[children[0]], tree.end[children[-1]])
+    tree.link(node, children)
+    nodes.append(node)
+
+# Adds the children of the expanded node; body is reversed, as on the stack
+def expand_node(tree, nodes, body, pos):
+    parent = nodes.pop()
+    if not body:
+        tree.start[parent] = tree.end[parent] = pos
+        return
+    children = [tree.add(symbol, pos, pos) for symbol in reversed(body)]
+    tree.link(parent, children)
+    nodes.extend(reversed(children))
+
+def match_node(tree, nodes, pos):
+    node = nodes.pop()
+    tree.start[node] = pos
+    tree.end[node] = pos + 1
+
+# Runs a parser over input_string, lexing it first for tokenized grammars.
+# Positions in the result, and tree spans, are offsets into input_string.
+def run_parser(parser, compiled, input_string, tree=None):
+    if compiled.lexer is None or not isinstance(input_string, str):
+        result = parser(compiled, input_string, tree)
+    else:
+        offsets = []
+        ends = [] if tree is not None else None
+        result = parser(compiled, compiled.lexer.kinds(input_string, offsets, ends), tree)
+        pos = result['position']
+        result['position'] = offsets[pos] if pos < len(offsets) else len(input_string)
+        for error in result.get('errors', ()):
+            pos = error['position']
+            error['position'] = offsets[pos] if pos < len(offsets) else len(input_string)
+        if tree is not None and result['success']:
+            tree.remap(offsets, ends, len(input_string))
+    if tree is not None and result['success']:
+        result['tree'] = tree
+    return result
+
+# With recover, a failed parse is run again by the recovering parser and the
+# result lists every error in 'errors'; accepted input stays on the fast path
+def parse_string_slr(compiled, input_string, trace=False, build_tree=False, recover=False):
+    tree = ParseTree(compiled.grammar) if build_tree else None
+    result = run_parser(trace_slr if trace else recognize_slr, compiled, input_string, tree)
+    if recover:
+        result['errors'] = [] if result['success'] else run_parser(recover_slr, compiled, input_string)['errors']
+    return result
+
+def parse_string_ll1(compiled, input_string, trace=False, build_tree=False, recover=False):
+    tree = ParseTree(compiled.grammar) if build_tree else None
+    result = run_parser(trace_ll1 if trace else recognize_ll1, compiled, input_string, tree)
+    if recover:
+        result['errors'] = [] if result['success'] else run_parser(recover_ll1, compiled, input_string)['errors']
+    return result
+
+# Every parse of input_string on an LR table, conflicts included. The result
+# counts the parses; with build_forest it carries the shared packed forest.
+def parse_string_glr(compiled, input_string, build_forest=False):
+    result = run_parser(recognize_glr, compiled, input_string, ParseForest(compiled.grammar))
+    forest = result.pop('tree', None)
+    if build_forest and forest is not None:
+        result['forest'] = forest
+    return result
+
+# The terminals that can follow input_string, which may be incomplete; when
+# it has an error, where that is and what was expected there
+def expected_after(compiled, input_string):
+    return run_parser(prefix_ll1 if compiled.kind == 'll1' else prefix_slr, compiled, input_string)
+
+def parse_input(compiled, input_string, trace=False, build_tree=False):
+    if compiled.kind == 'll1':
+        return parse_string_ll1(compiled, input_string, trace, build_tree)
+    return parse_string_slr(compiled, input_string, trace, build_tree)
@@ -0,0 +1,155 @@
+import codecs
+from table import ERROR, ACCEPT
+from parsers import lr_step
+
+READ_SIZE = 64 * 1024
+
+
+# Push-style parsers: input arrives through feed(chunk) and the parse is
+# completed by finish(). Only the parser stack and, for tokenized grammars,
+# the not yet decided tail of the last chunk are kept between calls.
+#
+# feed() returns None while the input is still acceptable and the final
+# result dict once the parse has failed; later chunks are then ignored.
+# finish() always returns the result dict. Positions are offsets into the
+# whole input, as with parse_string_slr/parse_string_ll1.
+class PushParser:
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.lexer = compiled.lexer
+        self.buffer = ''
+        self.offset = 0      # input offset of buffer[0]
+        self.position = 0    # input offset of the symbol being pushed
+        self.result = None
+
+    def fail(self, message, expected=None):
+        self.result = {'success': False, 'message': message, 'position': self.position}
+        if expected is not None:
+            self.result['expected'] = expected
+        return self.result
+
+    def accept(self):
+        self.result = {'success': True, 'message': 'String accepted!', 'position': self.position}
+        return self.result
+
+    def feed(self, chunk):
+        if self.result is not None:
+            return self.result
+        if self.lexer is None:
+            push = self.push
+            for symbol in chunk:
+                if push(symbol) is not None:
+                    return self.result
+                self.position += 1
+            return None
+
+        text = self.buffer + chunk if self.buffer else chunk
+        kinds, offsets = [], []
+        consumed = self.lexer.partial_kinds(text, kinds, offsets)
+        self.buffer = text[consumed:]
+        result = self.push_kinds(kinds, offsets)
+        self.offset += consumed
+        return result
+
+    def push_kinds(self, kinds, offsets):
+        push = self.push
+        for kind, start in zip(kinds, offsets):
+            self.position = self.offset + start
+            if push(kind) is not None:
+                return self.result
+        return None
+
+    def finish(self):
+        if self.result is not None:
+            return self.result
+        if self.buffer:
+            offsets = []
+            kinds = list(self.lexer.kinds(self.buffer, offsets))
+            if self.push_kinds(kinds, offsets) is not None:
+                return self.result
+            self.offset += len(self.buffer)
+            self.buffer = ''
+        if self.lexer is not None:
+            self.position = self.offset
+        return self.push('$') or self.fail("Unexpected end of input")
+
+
+class LRPushParser(PushParser):
+    def __init__(self, compiled):
+        super().__init__(compiled)
+        self.table = compiled.table
+        self.production_list = compiled.grammar.production_list
+        self.stack = [0]
+
+    # Runs every reduction the symbol triggers, then shifts it
+    def push(self, symbol):
+        action, message = lr_step(self.table, self.stack, symbol, self.production_list)
+        if action == ACCEPT:
+            return self.accept()
+        elif message is None:
+            return None
+        elif action == ERROR:
+            return self.fail(message, self.compiled.expected(self.stack[-1]))
+        return self.fail(message)
+
+
+class LL1PushParser(PushParser):
+    def __init__(self, compiled):
+        super().__init__(compiled)
+        self.expansions = compiled.expansions
+        self.t_list = compiled.grammar.t_list
+        self.stack = ['$', compiled.grammar.start_symbol]
+
+    # Expands non-terminals on top of the stack until the symbol is matched
+    def push(self, symbol):
+        stack = self.stack
+        expansions = self.expansions
+        while True:
+            top = stack[-1]
+            if top == '$' and symbol == '$':
+                return self.accept()
+            elif top in self.t_list or top == '$':
+                if top != symbol:
+                    return self.fail(f"Expected '{top}', found '{symbol}'", self.compiled.expected(top))
+                stack.pop()
+                return None
+            elif top in expansions:
+                body = expansions[top].get(symbol)
+                if body is None:
+                    return self.fail(f"No production for {top} on '{symbol}'", self.compiled.expected(top))
+                stack.pop()
+                stack.extend(body)
+            else:
+                return self.fail(f"Unknown symbol '{top}' on stack")
+
+
+def push_parser(compiled):
+    if compiled.kind == 'll1':
+        return LL1PushParser(compiled)
+    return LRPushParser(compiled)
+
+
+# Reads a binary or text file object in fixed-size chunks, decoding bytes as UTF-8
+def read_chunks(f, size=READ_SIZE, encoding='utf-8'):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+# Parses input arriving as an iterable of chunks (a generator, read_chunks
+# over a file or socket, ...) without holding the whole input
+def parse_stream(compiled, chunks):
+    parser = push_parser(compiled)
+    for chunk in chunks:
+        if parser.feed(chunk) is not None:
+            break
+    return parser.finish()
@@ -0,0 +1,140 @@
+from array import array
+
+# ACTION cells: 0 is an error, shift to s is s + 1, reduce by p is -(p + 1).
+# Production 0 is the augmented start production, so reducing by it (-1) accepts.
+# GOTO cells hold the target state + 1, or 0 when there is no edge.
+ERROR = 0
+ACCEPT = -1
+
+
+def shift(state):
+    return state + 1
+
+
+def reduce(prod):
+    return -prod - 1
+
+
+class Matrix:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.cells = array('i', [0]) * (rows * cols)
+
+    def get(self, row, col):
+        return self.cells[row * self.cols + col]
+
+    def set(self, row, col, value):
+        self.cells[row * self.cols + col] = value
+
+    def row(self, row):
+        return self.cells[row * self.cols:(row + 1) * self.cols]
+
+    def size(self):
+        return len(self.cells)
+
+
+# Row-displacement (comb) packing: the non-empty cells of every row are laid
+# into one shared vector at an offset where they do not collide, and check[]
+# records which row owns each slot.
+class CombMatrix:
+    def __init__(self, matrix):
+        self.rows = matrix.rows
+        self.cols = matrix.cols
+        self.base = array('i', [0]) * matrix.rows
+        value = array('i')
+        check = array('i')
+
+        rows = [[(c, v) for c, v in enumerate(matrix.row(r)) if v] for r in range(matrix.rows)]
+        first_free = 0
+        for r in sorted(range(matrix.rows), key=lambda r: -len(rows[r])):
+            cells = rows[r]
+            if not cells:
+                continue
+            b = first_free - cells[0][0]
+            while True:
+                if b >= 0 and all(b + c >= len(check) or check[b + c] == -1 for c, _ in cells):
+                    break
+                b += 1
+            end = b + cells[-1][0] + 1
+            if end > len(check):
+                check.extend([-1] * (end - len(check)))
+                value.extend([0] * (end - len(value)))
+            for c, v in cells:
+                check[b + c] = r
+                value[b + c] = v
+            self.base[r] = b
+            while first_free < len(check) and check[first_free] != -1:
+                first_free += 1
+
+        # Pad so base[row] + col never runs past the end
+        pad = max(self.base, default=0) + self.cols - len(check)
+        if pad > 0:
+            check.extend([-1] * pad)
+            value.extend([0] * pad)
+        self.value = value
+        self.check = check
+
+    def get(self, row, col):
+        i = self.base[row] + col
+        if self.check[i] == row:
+            return self.value[i]
+        return 0
+
+    def row(self, row):
+        return array('i', (self.get(row, c) for c in range(self.cols)))
+
+    def size(self):
+        return len(self.base) + len(self.value) + len(self.check)
+
+
+class ParseTable:
+    def __init__(self, terminals, nonterminals, n_states, productions):
+        self.terminals = list(terminals)
+        self.nonterminals = list(nonterminals)
+        self.terminal_ids = {t: i for i, t in enumerate(self.terminals)}
+        self.nonterminal_ids = {nt: i for i, nt in enumerate(self.nonterminals)}
+        self.n_states = n_states
+        self.productions = list(productions)
+        self.prod_heads = array('i', (self.nonterminal_ids.get(head, -1) for head, _ in self.productions))
+        self.prod_lengths = array('i', (len(body) for _, body in self.productions))
+        self.action = Matrix(n_states, len(self.terminals))
+        self.goto = Matrix(n_states, len(self.nonterminals))
+        # (state, terminal id) -> every action of a conflicting cell, the one
+        # in ACTION first; the GLR parser follows all of them
+        self.alternatives = {}
+        # Per state, the bitset over terminal ids of cells with an action
+        self.expected_bits = [0] * n_states
+
+    def compress(self):
+        self.action = CombMatrix(self.action)
+        self.goto = CombMatrix(self.goto)
+        return self
+
+    def size(self):
+        return self.action.size() + self.goto.size()
+
+    # Terminals with an action in state, in header order
+    def expected(self, state):
+        return self.terminal_symbols(self.expected_bits[state])
+
+    def terminal_symbols(self, bits):
+        return [t for i, t in enumerate(self.terminals) if bits >> i & 1]
+
+    # String form of a cell, as shown in the TABLE response
+    def render_cell(self, state, symbol):
+        if symbol in self.terminal_ids:
+            action = self.action.get(state, self.terminal_ids[symbol])
+            if action == ERROR:
+                return ''
+            if action == ACCEPT:
+                return 'Accept'
+            if action > 0:
+                return f"s{action - 1}"
+            return f"r{-action - 1}"
+        target = self.goto.get(state, self.nonterminal_ids[symbol])
+        return str(target - 1) if target else ''
+
+    # Cells of one state, terminals first, in header order
+    def render_row(self, state):
+        return [self.render_cell(state, sym) for sym in self.terminals + self.nonterminals]
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the app's grammar cache in memory while testing
+os.environ['GRAMMAR_CACHE_DIR'] = ''
+
+
+@pytest.fixture
+def client():
+    import app
+    app.grammar_cache.entries.clear()
+    return app.app.test_client()
@@ -0,0 +1,42 @@
+import os
+
+from cache import GrammarCache
+from compiler import compile_grammar, compile_key
+
+
+def test_tokenized_spacing_is_part_of_the_key():
+    one = "%token id [a-z]+\nS -> id"
+    two = "%token id [a-z]+\nS -> i d"
+    assert compile_key(one, 'lr', tokenized=True) != compile_key(two, 'lr', tokenized=True)
+
+
+def test_token_pattern_spacing_is_part_of_the_key():
+    one = "%token word a b\nS -> word"
+    two = "%token word ab\nS -> word"
+    assert compile_key(one, 'lr', tokenized=True) != compile_key(two, 'lr', tokenized=True)
+
+
+def test_grammar_format_is_part_of_the_key():
+    assert compile_key("S->ab", 'lr', tokenized=False) != compile_key("S->ab", 'lr', tokenized=True)
+
+
+def test_cache_returns_the_grammar_asked_for():
+    cache = GrammarCache()
+    options = {'method': 'lalr1', 'compress_table': False, 'compare_lr1': False}
+    one, _ = compile_grammar("S -> id", 'lr', cache, tokenized=True, **options)
+    two, cached = compile_grammar("S -> i d", 'lr', cache, tokenized=True, **options)
+    assert not cached
+    assert list(one.grammar.t_list) == ['id']
+    assert list(two.grammar.t_list) == ['i', 'd']
+
+
+def test_disk_tier_drops_the_least_recently_used(tmp_path):
+    cache = GrammarCache(capacity=1, directory=str(tmp_path), disk_capacity=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    os.utime(tmp_path / 'a.pickle', (0, 0))
+    os.utime(tmp_path / 'b.pickle', (1, 1))
+    cache.clear()
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert sorted(os.listdir(tmp_path)) == ['a.pickle', 'c.pickle']
@@ -0,0 +1,93 @@
+import itertools
+import random
+
+import pytest
+
+from codegen import generate_module, main
+from compiler import compile_grammar
+from parsers import parse_string_slr
+
+EXPRESSIONS = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+TOKENS = "%token id [a-z]+\n%token num [0-9]+\n%skip \\s+\nS -> S ; A | A\nA -> id = E\nE -> E + T | T\nT -> id | num | ( E )"
+
+
+def build(text, method='lalr1', tokenized=False):
+    compiled, _ = compile_grammar(text, 'lr', tokenized=tokenized, method=method, compress_table=False, compare_lr1=False)
+    return compiled
+
+
+def load(compiled):
+    namespace = {}
+    exec(compile(generate_module(compiled), '<generated>', 'exec'), namespace)
+    return namespace
+
+
+def same_result(generated, expected):
+    return (
+        generated['success'] == expected['success']
+        and generated['position'] == expected['position']
+        and generated.get('expected') == expected.get('expected')
+    )
+
+
+@pytest.mark.parametrize('method', ['lr1', 'lalr1', 'slr1', 'auto'])
+def test_generated_module_accepts_what_parse_input_accepts(method):
+    compiled = build(EXPRESSIONS, method)
+    parse = load(compiled)['parse']
+    for n in range(6):
+        for symbols in itertools.product('i+*()', repeat=n):
+            text = ''.join(symbols)
+            assert same_result(parse(text), parse_string_slr(compiled, text)), text
+
+
+# Random programs of TOKENS, half of them with one character replaced or removed
+def random_program(rng):
+    def expression(depth):
+        terms = [rng.choice(['x', 'yz', '1', '42']) if depth > 2 or rng.random() < 0.7 else f"({expression(depth + 1)})"
+                 for _ in range(rng.randint(1, 3))]
+        return rng.choice([' + ', '+']).join(terms)
+    text = '; '.join(f"{rng.choice(['a', 'bc'])} = {expression(0)}" for _ in range(rng.randint(1, 3)))
+    if rng.random() < 0.5:
+        i = rng.randrange(len(text) + 1)
+        text = text[:i] + rng.choice(['', '=', '+', ';', '(', ')', '?', 'é']) + text[i + 1:]
+    return text
+
+
+def test_generated_module_for_tokenized_grammar():
+    compiled = build(TOKENS, tokenized=True)
+    parse = load(compiled)['parse']
+    rng = random.Random(0)
+    inputs = ['a = 1', 'a = (b + 2); c = d', 'a = ', '= 1', 'a = 1 +', 'a = é', '']
+    inputs += [random_program(rng) for _ in range(300)]
+    accepted = 0
+    for text in inputs:
+        result = parse(text)
+        accepted += result['success']
+        assert same_result(result, parse_string_slr(compiled, text)), text
+    assert 0 < accepted < len(inputs)
+
+
+def test_generated_module_with_conflicts_follows_the_table():
+    compiled = build("E->E+E\nE->a")
+    assert compiled.conflicts
+    parse = load(compiled)['parse']
+    for text in ['a', 'a+a+a', 'a+', '+a']:
+        assert same_result(parse(text), parse_string_slr(compiled, text))
+
+
+def test_generated_recognizer_bounds_reduction_loops():
+    compiled = build("S->\nS->ac\nS->SSa", 'lr0')
+    result = load(compiled)['parse']('c')
+    assert result == parse_string_slr(compiled, 'c')
+    assert result['message'].startswith('Reductions loop')
+
+
+def test_command_line(tmp_path, capsys):
+    grammar = tmp_path / 'grammar.txt'
+    grammar.write_text("E->E+E\nE->a", encoding='utf-8')
+    output = tmp_path / 'parser.py'
+    assert main([str(grammar), '-o', str(output)]) == 0
+    assert 'shift/reduce conflict' in capsys.readouterr().err
+    namespace = {}
+    exec(output.read_text(encoding='utf-8'), namespace)
+    assert namespace['parse']('a+a')['success']
@@ -0,0 +1,29 @@
+import pytest
+
+# R->ϵ is the classic format's empty production
+EPSILON_GRAMMAR = "E->TR\nR->+TR\nR->ϵ\nT->i"
+
+
+@pytest.mark.parametrize('route', ['/compute', '/compute_ll1'])
+@pytest.mark.parametrize('input_string, accepted', [('i', True), ('i+i+i', True), ('i+', False)])
+def test_epsilon_production(client, route, input_string, accepted):
+    response = client.post(route, json={'grammar': EPSILON_GRAMMAR, 'input_string': input_string})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['FIRST']['R'] == ['+', 'ϵ']
+    assert data['FOLLOW']['R'] == ['$']
+    assert data['PARSING_RESULT']['success'] is accepted
+
+
+@pytest.mark.parametrize('input_string', ['i', 'i+i', 'i+i+i', 'i+', '+i', 'ii', ''])
+def test_ll1_trace_and_recognizer_agree(input_string):
+    from compiler import compile_grammar
+    from parsers import parse_string_ll1
+
+    compiled, _ = compile_grammar(EPSILON_GRAMMAR, 'll1')
+    assert compiled.expansions['R']['$'] == ()
+    fast = parse_string_ll1(compiled, input_string)
+    traced = parse_string_ll1(compiled, input_string, trace=True)
+    assert fast['success'] == traced['success']
+    assert fast['message'] == traced['message']
+    assert fast['position'] == traced['position']
@@ -0,0 +1,65 @@
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_glr, parse_string_slr
+
+AMBIGUOUS = "E->E+E\nE->a"
+
+
+def build(text, method='lalr1', **options):
+    compiled, _ = compile_grammar(text, 'lr', method=method, compress_table=False, compare_lr1=False, **options)
+    return compiled
+
+
+# E->E+E has a Catalan number of parses: one per way to bracket the operands
+@pytest.mark.parametrize('operands, parses', [(1, 1), (2, 1), (3, 2), (4, 5), (5, 14), (6, 42)])
+def test_catalan_parse_counts(operands, parses):
+    result = parse_string_glr(build(AMBIGUOUS), '+'.join('a' * operands))
+    assert result['success']
+    assert result['parses'] == parses
+
+
+def test_forest_shares_the_derivations():
+    result = parse_string_glr(build(AMBIGUOUS), 'a+a+a', build_forest=True)
+    forest = result['forest']
+    assert forest.ambiguous
+    assert forest.count_trees() == 2
+    assert (forest.start[forest.root], forest.end[forest.root]) == (0, 5)
+    alternatives = list(forest.alternatives(forest.root))
+    assert len(alternatives) == 2
+    assert all(len(children) == 3 for _, children in alternatives)
+
+
+def test_cycle_has_infinitely_many_parses():
+    result = parse_string_glr(build("S->S\nS->a"), 'a')
+    assert result['success']
+    assert result['parses'] is None
+
+
+def test_rejects_like_lr():
+    compiled = build(AMBIGUOUS)
+    result = parse_string_glr(compiled, 'a+')
+    assert not result['success']
+    assert result['position'] == 2
+    assert result['expected'] == ['a']
+
+
+@pytest.mark.parametrize('input_string', ['i', 'i+i*i', '(i+i)*i', 'i+', '(i', 'i)'])
+def test_agrees_with_lr_on_a_deterministic_grammar(input_string):
+    compiled = build("E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i")
+    glr = parse_string_glr(compiled, input_string)
+    lr = parse_string_slr(compiled, input_string)
+    assert glr['success'] == lr['success']
+    assert glr['position'] == lr['position']
+    if glr['success']:
+        assert glr['parses'] == 1
+
+
+def test_forest_spans_are_input_offsets():
+    compiled = build("%token id [a-z]+\n%skip \\s+\nE -> E + E | id", tokenized=True)
+    result = parse_string_glr(compiled, 'ab + c + d', build_forest=True)
+    forest = result['forest']
+    assert result['parses'] == 2
+    assert (forest.start[forest.root], forest.end[forest.root]) == (0, 10)
+    spans = {(forest.start[n], forest.end[n]) for n in range(len(forest)) if forest.symbols[forest.symbol[n]] == 'id'}
+    assert spans == {(0, 2), (5, 6), (9, 10)}
@@ -0,0 +1,91 @@
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_slr, parse_string_ll1
+
+EXPRESSIONS = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+# Edits of EXPRESSIONS: a new production, a removed one, one that makes a
+# non-terminal nullable (changing FIRST and FOLLOW), and one that is reordered
+EDITS = [
+    EXPRESSIONS + "\nF->i*",
+    "E->E+T\nE->T\nT->T*F\nT->F\nF->i",
+    EXPRESSIONS + "\nF->ϵ",
+    "F->i\nE->E+T\nE->T\nT->T*F\nT->F\nF->(E)",
+    "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i\nF->+i",
+]
+INPUTS = ['i', 'i+i*i', '(i+i)*i', 'i*', '+i', 'i+', '()', '']
+
+
+def build(text, kind='lr', base=None, **options):
+    if kind == 'lr':
+        options.setdefault('compress_table', False)
+        options.setdefault('compare_lr1', False)
+    compiled, _ = compile_grammar(text, kind, base=base, **options)
+    return compiled
+
+
+def assert_same_build(warm, cold):
+    assert warm.response() == {**cold.response(), 'HANDLE': warm.key}
+    assert warm.grammar.first_bits == cold.grammar.first_bits
+    assert warm.grammar.follow_bits == cold.grammar.follow_bits
+    if warm.kind == 'lr':
+        assert warm.states == cold.states
+        assert warm.transitions == cold.transitions
+        assert warm.table.action.cells == cold.table.action.cells
+        assert warm.table.goto.cells == cold.table.goto.cells
+
+
+@pytest.mark.parametrize('method', ['lr1', 'lalr1', 'slr1', 'auto'])
+@pytest.mark.parametrize('edited', EDITS)
+def test_incremental_lr_build_equals_cold_build(method, edited):
+    base = build(EXPRESSIONS, method=method)
+    warm = build(edited, base=base, method=method)
+    cold = build(edited, method=method)
+    assert_same_build(warm, cold)
+    for input_string in INPUTS:
+        assert parse_string_slr(warm, input_string) == parse_string_slr(cold, input_string)
+
+
+def test_incremental_lr1_build_reuses_states():
+    base = build(EXPRESSIONS)
+    warm = build(EXPRESSIONS + "\nF->i*", base=base)
+    assert warm.metrics.counts['reused_states'] > 0
+    assert warm.metrics.counts['closure_calls'] < build(EXPRESSIONS + "\nF->i*").metrics.counts['closure_calls']
+
+
+@pytest.mark.parametrize('edited', ["E->TR\nR->+TR\nR->ϵ\nT->i\nT->(E)", "E->TR\nR->+TR\nR->-TR\nR->ϵ\nT->i"])
+def test_incremental_ll1_build_equals_cold_build(edited):
+    base = build("E->TR\nR->+TR\nR->ϵ\nT->i", 'll1')
+    warm = build(edited, 'll1', base=base)
+    cold = build(edited, 'll1')
+    assert_same_build(warm, cold)
+    assert warm.expansions == cold.expansions
+    for input_string in ['i', 'i+i', 'i-(i)', '(i+i)', 'i+', '']:
+        assert parse_string_ll1(warm, input_string) == parse_string_ll1(cold, input_string)
+
+
+def test_base_of_another_kind_is_ignored():
+    base = build("E->TR\nR->+TR\nR->ϵ\nT->i", 'll1')
+    edited = "E->TR\nR->+TR\nR->ϵ\nT->i\nT->(E)"
+    assert_same_build(build(edited, base=base), build(edited))
+
+
+TOKENS = "%token id [a-z]+\n%token num [0-9]+\n%skip \\s+\n"
+
+
+def test_incremental_tokenized_build_reuses_the_lexer():
+    base = build(TOKENS + "S -> id = num", tokenized=True, method='lalr1')
+    edited = TOKENS + "S -> id = num | id = id"
+    warm = build(edited, base=base, tokenized=True, method='lalr1')
+    assert warm.lexer is base.lexer
+    assert_same_build(warm, build(edited, tokenized=True, method='lalr1'))
+    assert parse_string_slr(warm, 'a = b')['success']
+
+
+def test_changed_tokens_rebuild_the_lexer():
+    base = build(TOKENS + "S -> id = num", tokenized=True, method='lalr1')
+    edited = "%token id [a-z_]+\n%token num [0-9]+\n%skip \\s+\nS -> id = num"
+    warm = build(edited, base=base, tokenized=True, method='lalr1')
+    assert warm.lexer is not base.lexer
+    assert parse_string_slr(warm, 'a_b = 1')['success']
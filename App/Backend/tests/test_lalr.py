@@ -0,0 +1,54 @@
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_slr
+
+# The classic grammar that is LALR(1) but not SLR(1): FOLLOW(R) holds '=',
+# which an LR(0) state reached on L both reduces and shifts on
+ASSIGNMENT = "S->L=R\nS->R\nL->*R\nL->i\nR->L"
+
+
+def build(text, method, compare_lr1=False):
+    compiled, _ = compile_grammar(text, 'lr', method=method, compress_table=False, compare_lr1=compare_lr1)
+    return compiled
+
+
+def test_lalr_has_no_conflict_where_slr_does():
+    assert build(ASSIGNMENT, 'lalr1').conflicts == []
+    conflicts = build(ASSIGNMENT, 'slr1').conflicts
+    assert [(c['type'], c['symbol']) for c in conflicts] == [('shift/reduce', '=')]
+
+
+def test_lalr_merges_lr1_states():
+    lalr = build(ASSIGNMENT, 'lalr1')
+    lr1 = build(ASSIGNMENT, 'lr1')
+    assert len(lalr.states) < len(lr1.states)
+    assert build(ASSIGNMENT, 'lalr1', compare_lr1=True).artifacts['STATE_SAVINGS'] == {
+        'lr1': len(lr1.states),
+        'lalr1': len(lalr.states),
+        'saved': len(lr1.states) - len(lalr.states)
+    }
+
+
+@pytest.mark.parametrize('input_string', ['i', 'i=i', '*i=**i', '**i', 'i=', '=i', 'i==i', '*', ''])
+def test_lalr_parses_like_lr1(input_string):
+    lalr = parse_string_slr(build(ASSIGNMENT, 'lalr1'), input_string)
+    lr1 = parse_string_slr(build(ASSIGNMENT, 'lr1'), input_string)
+    assert lalr['success'] == lr1['success']
+    assert lalr['position'] == lr1['position']
+
+
+# Merging LR(1) states with the same core mixes the lookaheads of A->c and
+# B->c, which only LR(1) keeps apart
+def test_lalr_reports_merged_reduce_conflicts():
+    text = "S->aAd\nS->bBd\nS->aBe\nS->bAe\nA->c\nB->c"
+    assert build(text, 'lr1').conflicts == []
+    assert {c['type'] for c in build(text, 'lalr1').conflicts} == {'reduce/reduce'}
+
+
+def test_compute_route_with_lalr(client):
+    response = client.post('/compute', json={'grammar': ASSIGNMENT, 'method': 'lalr1', 'input_string': '*i=i'})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['METHOD'] == 'lalr1'
+    assert data['PARSING_RESULT']['success'] is True
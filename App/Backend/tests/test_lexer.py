@@ -0,0 +1,63 @@
+import pytest
+
+from lexer import Lexer
+
+
+def kinds(rules, text):
+    return list(Lexer(rules).kinds(text))
+
+
+# Syntax the regex parser does not support is an error, not literal text
+@pytest.mark.parametrize('pattern', ['a{2}', '0x[0-9a-f]{1,4}', '^a', 'a$', '[z-a]'])
+def test_unsupported_pattern_is_rejected(pattern):
+    with pytest.raises(ValueError, match='Bad pattern'):
+        Lexer([('t', pattern)])
+
+
+def test_escaped_braces_and_anchors_are_literal():
+    assert kinds([('t', r'\{\^\$\}')], '{^$}') == ['t']
+
+
+def test_literal_terminals_with_braces():
+    from compiler import compile_grammar
+    from parsers import parse_string_slr
+
+    compiled, _ = compile_grammar("Block -> { Stmts }\nStmts -> Stmts x | x", 'lr', tokenized=True, method='lalr1', compress_table=False, compare_lr1=False)
+    assert parse_string_slr(compiled, '{ x x }')['success']
+
+
+ASSIGNMENTS = "%token id [a-z]+\n%token num [0-9]+\n%skip \\s+\n%skip #[^\\n]*\nS -> 'if' id | id = num"
+
+
+def tokenized(text):
+    from compiler import compile_grammar
+
+    compiled, _ = compile_grammar(text, 'lr', tokenized=True, method='lalr1', compress_table=False, compare_lr1=False)
+    return compiled
+
+
+# A keyword wins over the identifier pattern at the same length, and the
+# longest match wins otherwise
+@pytest.mark.parametrize('text, expected', [
+    ('if x', ['if', 'id']),
+    ('iffy = 12', ['id', '=', 'num']),
+    ('ifx', ['id']),
+])
+def test_keyword_and_identifier(text, expected):
+    assert list(tokenized(ASSIGNMENTS).lexer.kinds(text)) == expected
+
+
+def test_skip_rules_and_offsets():
+    offsets = []
+    kinds = list(tokenized(ASSIGNMENTS).lexer.kinds('if   # note\n x', offsets))
+    assert kinds == ['if', 'id']
+    assert offsets == [0, 13]
+
+
+def test_unmatched_character_is_an_invalid_symbol():
+    from parsers import parse_string_slr
+
+    result = parse_string_slr(tokenized(ASSIGNMENTS), 'x = @')
+    assert not result['success']
+    assert result['message'].startswith("Invalid symbol '@'")
+    assert result['position'] == 4
@@ -0,0 +1,45 @@
+import pytest
+
+from codegen import generate_module
+from compiler import compile_grammar
+from parsers import parse_string_slr, expected_after
+from stream import parse_stream
+
+# In LR(0) every terminal is a lookahead: state 3 reduces S->ϵ on 'c' and
+# GOTO(3, S) is state 3 again
+LR0_LOOP = "S->\nS->ac\nS->SSa"
+
+
+def test_compute_stops_on_a_reduction_loop(client):
+    response = client.post('/compute', json={'grammar': LR0_LOOP, 'method': 'lr0', 'input_string': 'c'})
+    assert response.status_code == 200
+    result = response.get_json()['PARSING_RESULT']
+    assert not result['success']
+    assert result['message'].startswith('Reductions loop')
+
+
+@pytest.mark.parametrize('parse', [
+    lambda compiled: parse_string_slr(compiled, 'c'),
+    lambda compiled: parse_string_slr(compiled, 'c', trace=True, build_tree=True),
+    lambda compiled: parse_string_slr(compiled, 'c', recover=True),
+    lambda compiled: expected_after(compiled, 'c'),
+    lambda compiled: parse_stream(compiled, ['c']),
+])
+def test_every_lr_parser_stops(parse):
+    compiled, _ = compile_grammar(LR0_LOOP, 'lr', method='lr0', compress_table=False, compare_lr1=False)
+    result = parse(compiled)
+    assert not result['success']
+    assert result['message'] == "Reductions loop on symbol 'c' in state 3"
+
+
+def test_generated_module_stops():
+    compiled, _ = compile_grammar(LR0_LOOP, 'lr', method='lr0', compress_table=False, compare_lr1=False)
+    module = {}
+    exec(generate_module(compiled), module)
+    assert module['parse']('c')['message'] == "Reductions loop on symbol 'c' in state 3"
+
+
+def test_other_methods_parse_the_grammar():
+    compiled, _ = compile_grammar(LR0_LOOP, 'lr', method='slr1', compress_table=False, compare_lr1=False)
+    assert parse_string_slr(compiled, 'ac')['success']
+    assert not parse_string_slr(compiled, 'c')['success']
@@ -0,0 +1,71 @@
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_slr
+
+# One grammar per method: the cheapest construction that has no conflict
+GRAMMARS = {
+    'lr0': "S->(S)\nS->a",
+    # R->ϵ reduces on every terminal in LR(0), '+' included
+    'slr1': "E->TR\nR->+TR\nR->ϵ\nT->i",
+    'lalr1': "S->L=R\nS->R\nL->*R\nL->i\nR->L",
+    # LALR(1) merges the states that reduce A->c and B->c
+    'lr1': "S->aAd\nS->bBd\nS->aBe\nS->bAe\nA->c\nB->c",
+}
+AUTO_ORDER = ['lr0', 'slr1', 'lalr1', 'lr1']
+
+
+def build(text, method):
+    compiled, _ = compile_grammar(text, 'lr', method=method, compress_table=False, compare_lr1=False)
+    return compiled
+
+
+@pytest.mark.parametrize('cheapest', AUTO_ORDER)
+def test_cheapest_method_is_conflict_free(cheapest):
+    text = GRAMMARS[cheapest]
+    for method in AUTO_ORDER:
+        conflicts = build(text, method).conflicts
+        if AUTO_ORDER.index(method) < AUTO_ORDER.index(cheapest):
+            assert conflicts, method
+        else:
+            assert conflicts == [], method
+
+
+@pytest.mark.parametrize('cheapest', AUTO_ORDER)
+def test_auto_picks_the_cheapest_conflict_free_method(cheapest):
+    compiled = build(GRAMMARS[cheapest], 'auto')
+    assert compiled.method == cheapest
+    assert compiled.artifacts['METHOD'] == cheapest
+    assert compiled.conflicts == []
+    tried = AUTO_ORDER[:AUTO_ORDER.index(cheapest) + 1]
+    if len(tried) > 1:
+        assert compiled.artifacts['METHODS_TRIED'] == tried
+    else:
+        assert 'METHODS_TRIED' not in compiled.artifacts
+    assert len(compiled.states) == len(build(GRAMMARS[cheapest], cheapest).states)
+
+
+@pytest.mark.parametrize('method', ['lr0', 'slr1', 'lalr1'])
+def test_lr0_based_methods_share_the_automaton(method):
+    text = GRAMMARS['lalr1']
+    assert build(text, method).transitions == build(text, 'lr0').transitions
+
+
+@pytest.mark.parametrize('method', ['slr1', 'lalr1', 'auto'])
+@pytest.mark.parametrize('input_string', ['i', 'i+i', 'i+i+i', 'i+', '+i', 'ii', ''])
+def test_conflict_free_methods_parse_like_lr1(method, input_string):
+    text = GRAMMARS['slr1']
+    compiled = build(text, method)
+    result = parse_string_slr(compiled, input_string)
+    expected = parse_string_slr(build(text, 'lr1'), input_string)
+    assert result['success'] == expected['success']
+    assert result['position'] == expected['position']
+
+
+def test_compute_route_with_auto(client):
+    response = client.post('/compute', json={'grammar': GRAMMARS['slr1'], 'method': 'auto', 'input_string': 'i+i'})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['METHOD'] == 'slr1'
+    assert data['METHODS_TRIED'] == ['lr0', 'slr1']
+    assert data['PARSING_RESULT']['success'] is True
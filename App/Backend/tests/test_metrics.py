@@ -0,0 +1,21 @@
+import pytest
+
+from compiler import compile_grammar
+
+EXPRESSIONS = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+
+def build_counts(method, compare_lr1):
+    compiled, _ = compile_grammar(EXPRESSIONS, 'lr', method=method, compress_table=False, compare_lr1=compare_lr1)
+    return compiled.method, compiled.metrics.counts
+
+
+# Rejected 'auto' candidates and the LR(1) comparison are not counted as the build
+@pytest.mark.parametrize('method', ['auto', 'slr1', 'lalr1'])
+def test_counts_are_for_the_chosen_build(method):
+    chosen, counts = build_counts(method, compare_lr1=True)
+    _, alone = build_counts(chosen, compare_lr1=False)
+    assert counts['closure_calls'] == alone['closure_calls']
+    assert counts['goto_calls'] == alone['goto_calls']
+    _, lr1 = build_counts('lr1', compare_lr1=False)
+    assert counts['compare_lr1_closure_calls'] == lr1['closure_calls']
@@ -0,0 +1,38 @@
+import pytest
+
+from compiler import compile_grammar
+from parsers import expected_after, parse_string_slr
+
+EXPRESSIONS = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+
+@pytest.mark.parametrize('prefix, expected', [
+    ('', ['(', 'i']),
+    ('i+', ['(', 'i']),
+    ('(i', ['+', '*', ')', '$']),
+])
+def test_prefix_expected(prefix, expected):
+    compiled, _ = compile_grammar(EXPRESSIONS, 'lr', method='lalr1', compress_table=False, compare_lr1=False)
+    result = expected_after(compiled, prefix)
+    assert result['success']
+    assert result['expected'] == expected
+
+
+def test_prefix_stops_at_the_error():
+    compiled, _ = compile_grammar(EXPRESSIONS, 'lr', method='lalr1', compress_table=False, compare_lr1=False)
+    result = expected_after(compiled, 'i+*')
+    assert not result['success']
+    assert result['position'] == 2
+
+
+# A reduction without a GOTO entry is reported, not pushed as state -1
+@pytest.mark.parametrize('run', [
+    lambda compiled: expected_after(compiled, 'ab'),
+    lambda compiled: parse_string_slr(compiled, 'ab', recover=True)['errors'][-1],
+])
+def test_missing_goto_is_reported(run):
+    compiled, _ = compile_grammar("S->Ab\nA->a", 'lr', method='slr1', compress_table=False, compare_lr1=False)
+    table = compiled.table
+    table.goto.set(0, table.prod_heads[2], 0)
+    result = run(compiled)
+    assert result['message'].startswith('No goto for A')
@@ -0,0 +1,36 @@
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_slr
+
+# S only derives itself, and C->ϵ lets a resynchronised stack reduce forever
+CYCLIC = "S->SCC\nA->SCa\nB->SAA\nC->Sa\nC->"
+
+
+@pytest.mark.parametrize('input_string', ['a', '', 'aaa'])
+def test_recovery_stops_on_a_cyclic_grammar(input_string):
+    compiled, _ = compile_grammar(CYCLIC, 'lr', method='slr1', compress_table=False, compare_lr1=False)
+    plain = parse_string_slr(compiled, input_string)
+    result = parse_string_slr(compiled, input_string, recover=True)
+    assert not result['success']
+    assert result['errors'][0]['message'] == plain['message']
+
+
+# recover=True first runs the plain parser, which has to stop on these too
+@pytest.mark.parametrize('grammar, method, input_string', [
+    ("S->b\nS->S\nS->ScS", 'lr1', 'bcb'),
+    ("S->SSc\nS->\nS->SaS", 'slr1', 'a'),
+])
+def test_recover_stops_on_a_reduction_loop(grammar, method, input_string):
+    compiled, _ = compile_grammar(grammar, 'lr', method=method, compress_table=False, compare_lr1=False)
+    result = parse_string_slr(compiled, input_string, recover=True)
+    assert not result['success']
+    assert result['message'].startswith('Reductions loop')
+    assert result['errors'][0]['message'] == result['message']
+
+
+def test_recovery_reports_every_error():
+    compiled, _ = compile_grammar("E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i", 'lr', method='lalr1', compress_table=False, compare_lr1=False)
+    result = parse_string_slr(compiled, 'i+*i+i)i*(i', recover=True)
+    assert [error['position'] for error in result['errors']] == [2, 6, 11]
+    assert result['errors'][0]['expected'] == ['(', 'i']
@@ -0,0 +1,49 @@
+import pickle
+import threading
+
+from cache import GrammarCache
+from compiler import compile_grammar
+
+EXPRESSIONS = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+
+def test_render_timings_stay_out_of_the_build():
+    compiled, _ = compile_grammar(EXPRESSIONS, 'lr', method='lalr1', compress_table=False, compare_lr1=False)
+    stages = list(compiled.metrics.stages)
+    first, second = {}, {}
+    compiled.response(timings=first)
+    compiled.response(timings=second)
+    assert set(first) == {'render_states', 'render_table'}
+    assert second == {}
+    assert list(compiled.metrics.stages) == stages
+
+
+def test_concurrent_renders_of_a_cached_build():
+    cache = GrammarCache()
+    options = {'method': 'lalr1', 'compress_table': False, 'compare_lr1': False}
+    compiled, _ = compile_grammar(EXPRESSIONS, 'lr', cache, **options)
+    texts, errors = [], []
+
+    def render():
+        try:
+            hit, cached = compile_grammar(EXPRESSIONS, 'lr', cache, **options)
+            texts.append((cached, hit.states_text(), hit.table_text()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=render) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(set(texts)) == 1
+    assert texts[0][0]
+
+
+def test_rendered_build_can_be_pickled():
+    compiled, _ = compile_grammar(EXPRESSIONS, 'lr', method='lalr1', compress_table=False, compare_lr1=False)
+    compiled.response()
+    copy = pickle.loads(pickle.dumps(compiled))
+    assert copy.table_text() == compiled.table_text()
+    assert copy.response(timings={}) == compiled.response()
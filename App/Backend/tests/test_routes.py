@@ -0,0 +1,34 @@
+import pytest
+
+EXPRESSIONS = "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i"
+
+
+def post(client, route, data):
+    if route == '/parse_stream':
+        return client.post(route, query_string=data, data='i+i')
+    return client.post(route, json=data)
+
+
+# Every route that builds from 'parser' and 'method' validates them the same way
+@pytest.mark.parametrize('route', ['/conflicts', '/parse_batch', '/parse_stream', '/jobs'])
+@pytest.mark.parametrize('data, error', [
+    ({'parser': 'x'}, "Unknown parser 'x'"),
+    ({'method': 'zz'}, "Unknown method 'zz'"),
+])
+def test_unknown_parser_or_method(client, route, data, error):
+    response = post(client, route, dict(data, grammar=EXPRESSIONS))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_compute_rejects_an_unknown_method(client):
+    response = client.post('/compute', json={'grammar': EXPRESSIONS, 'method': 'zz'})
+    assert response.status_code == 400
+
+
+# The same options reach the same cache entry whichever route built it
+def test_routes_share_the_cached_build(client):
+    options = {'grammar': EXPRESSIONS, 'method': 'lalr1', 'compress_table': True}
+    assert not client.post('/conflicts', json=options).get_json()['CACHED']
+    assert client.post('/compute', json=options).get_json()['CACHED']
+    assert post(client, '/parse_stream', options).get_json()['success']
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_ll1, parse_string_slr
+from stream import parse_stream, read_chunks
+
+STATEMENTS = "%token id [a-z]+\n%token num [0-9]+\n%skip \\s+\nL -> L S | S\nS -> id = num ;"
+
+
+def statements():
+    compiled, _ = compile_grammar(STATEMENTS, 'lr', tokenized=True, method='lalr1', compress_table=False, compare_lr1=False)
+    return compiled
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# Chunks split identifiers and numbers; the result is that of the whole text
+@pytest.mark.parametrize('text', ['alpha = 12; beta = 345;', 'alpha = 12; beta = 3x;', 'alpha = 12', ''])
+@pytest.mark.parametrize('size', [1, 2, 3, 7])
+def test_chunks_split_tokens(text, size):
+    compiled = statements()
+    assert parse_stream(compiled, chunked(text, size)) == parse_string_slr(compiled, text)
+
+
+def test_bytes_split_inside_a_character():
+    compiled = statements()
+    text = 'alpha = 12; é = 3;'
+    result = parse_stream(compiled, read_chunks(io.BytesIO(text.encode()), size=3))
+    assert result == parse_string_slr(compiled, text)
+    assert result['position'] == text.index('é')
+
+
+@pytest.mark.parametrize('text', ['i+i+i', 'i+', '+i', 'ii', ''])
+def test_ll1_push_parser(text):
+    compiled, _ = compile_grammar("E->TR\nR->+TR\nR->\nT->i", 'll1')
+    assert parse_stream(compiled, chunked(text, 2)) == parse_string_ll1(compiled, text)
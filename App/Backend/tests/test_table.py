@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from compiler import compile_grammar
+from parsers import parse_string_slr
+from table import Matrix, CombMatrix
+
+GRAMMARS = [
+    "E->E+T\nE->T\nT->T*F\nT->F\nF->(E)\nF->i",
+    "S->L=R\nS->R\nL->*R\nL->i\nR->L",
+    "E->TR\nR->+TR\nR->ϵ\nT->i",
+    "S->aAd\nS->bBd\nS->aBe\nS->bAe\nA->c\nB->c",
+]
+
+
+def build(text, compress_table, method='lr1'):
+    compiled, _ = compile_grammar(text, 'lr', method=method, compress_table=compress_table, compare_lr1=False)
+    return compiled
+
+
+def cells(matrix):
+    return [[matrix.get(r, c) for c in range(matrix.cols)] for r in range(matrix.rows)]
+
+
+@pytest.mark.parametrize('text', GRAMMARS)
+@pytest.mark.parametrize('method', ['lr1', 'lalr1'])
+def test_compressed_tables_equal_dense(text, method):
+    dense = build(text, False, method).table
+    packed = build(text, True, method).table
+    assert isinstance(packed.action, CombMatrix)
+    assert isinstance(packed.goto, CombMatrix)
+    assert cells(packed.action) == cells(dense.action)
+    assert cells(packed.goto) == cells(dense.goto)
+    for r in range(dense.n_states):
+        assert packed.action.row(r) == dense.action.row(r)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('density', [0.0, 0.05, 0.3, 1.0])
+def test_comb_matrix_keeps_every_cell(seed, density):
+    rng = random.Random(seed)
+    matrix = Matrix(rng.randint(1, 40), rng.randint(1, 30))
+    for r in range(matrix.rows):
+        for c in range(matrix.cols):
+            if rng.random() < density:
+                matrix.set(r, c, rng.choice([-1, 1]) * rng.randint(1, 100))
+    assert cells(CombMatrix(matrix)) == cells(matrix)
+
+
+# Each state of a long production has a single action
+def test_sparse_table_is_smaller():
+    text = "S->abcdefghijklmnopqrst"
+    compiled = build(text, True)
+    sizes = compiled.artifacts['TABLE_CELLS']
+    assert sizes['stored'] < sizes['dense']
+
+
+@pytest.mark.parametrize('text', GRAMMARS[:2])
+@pytest.mark.parametrize('input_string', ['i', 'i+i*i', '(i+i)*i', 'i=*i', 'i+', ')', ''])
+def test_compressed_table_parses_the_same(text, input_string):
+    dense = parse_string_slr(build(text, False), input_string, trace=True)
+    packed = parse_string_slr(build(text, True), input_string, trace=True)
+    assert packed == dense
+
+
+def test_compressed_table_renders_the_same():
+    dense = build(GRAMMARS[0], False)
+    packed = build(GRAMMARS[0], True)
+    assert packed.table_text() == dense.table_text()
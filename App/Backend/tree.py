@@ -0,0 +1,81 @@
+from array import array
+
+NO_NODE = -1
+
+
+# Parse tree stored as parallel int arrays indexed by node id instead of one
+# object per node. Symbols are ids into symbols (terminals, '$', then
+# non-terminals); spans are [start, end) input positions. Children of a node
+# are first_child[n] followed by its next_sibling chain.
+class ParseTree:
+    def __init__(self, grammar):
+        self.symbols = list(grammar.t_list.keys()) + ['$'] + list(grammar.nt_list.keys())
+        self.symbol_ids = {sym: i for i, sym in enumerate(self.symbols)}
+        self.symbol = array('i')
+        self.start = array('i')
+        self.end = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.root = NO_NODE
+
+    def __len__(self):
+        return len(self.symbol)
+
+    def add(self, symbol, start, end):
+        self.symbol.append(self.symbol_ids[symbol])
+        self.start.append(start)
+        self.end.append(end)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        return len(self.symbol) - 1
+
+    # Links children (node ids, left to right) under parent
+    def link(self, parent, children):
+        if not children:
+            return
+        self.first_child[parent] = children[0]
+        next_sibling = self.next_sibling
+        for a, b in zip(children, children[1:]):
+            next_sibling[a] = b
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    # Sets the span of every non-terminal from its first and last child. Used
+    # by LL(1), where children get higher ids than their parent.
+    def close_spans(self):
+        first_child, next_sibling = self.first_child, self.next_sibling
+        for n in range(len(self.symbol) - 1, -1, -1):
+            child = first_child[n]
+            if child == NO_NODE:
+                continue
+            self.start[n] = self.start[child]
+            while next_sibling[child] != NO_NODE:
+                child = next_sibling[child]
+            self.end[n] = self.end[child]
+
+    # Rewrites every span through a position -> input offset mapping
+    def remap(self, starts, ends, length):
+        for n in range(len(self.symbol)):
+            s, e = self.start[n], self.end[n]
+            self.start[n] = starts[s] if s < len(starts) else length
+            self.end[n] = ends[e - 1] if e > s else self.start[n]
+
+    def to_dict(self):
+        return {
+            'symbols': self.symbols,
+            'root': self.root,
+            'symbol': self.symbol.tolist(),
+            'start': self.start.tolist(),
+            'end': self.end.tolist(),
+            'first_child': self.first_child.tolist(),
+            'next_sibling': self.next_sibling.tolist()
+        }
+
+    # Node count and root followed by the five arrays, as native-endian 32-bit ints
+    def to_bytes(self):
+        header = array('i', [len(self.symbol), self.root])
+        return b''.join(a.tobytes() for a in (header, self.symbol, self.start, self.end, self.first_child, self.next_sibling))
@@ -40,6 +40,7 @@ export default function App() {
       // Include input string if we want to parse it
       if (parseInput && inputString) {
         payload.input_string = inputString;
+        payload.trace = true;
       }
 
       const response = await fetch(`http://127.0.0.1:5000/${endpoint}`, {
@@ -1,9 +1,12 @@
 from collections import deque
 from collections import OrderedDict
 from pprint import pprint
+import os
+import sys
 import firstfollow
 from firstfollow import production_list, nt_list as ntl, t_list as tl
 nt_list, t_list=[], []
+prods_by_head={}
 
 class State:
 
@@ -23,45 +26,51 @@ class Item(str):
         return super(Item, self).__str__()+", "+'|'.join(self.lookahead)
         
 
-def closure(items):
+def index_productions():
 
-    def exists(newitem, items):
+    global prods_by_head
+    prods_by_head={}
+    for prod in production_list:
+        head, body=prod.split('->')
+        prods_by_head.setdefault(head, []).append(body)
 
-        for i in items:
-            if i==newitem and sorted(set(i.lookahead))==sorted(set(newitem.lookahead)):
-                return True
-        return False
 
+def closure(items):
 
-    global production_list
+    lookaheads=OrderedDict()
+    for i in items:
+        lookaheads.setdefault(str.__str__(i), set()).update(i.lookahead)
 
-    while True:
-        flag=0
-        for i in items: 
-            
-            if i.index('.')==len(i)-1: continue
+    queue=deque(lookaheads)
+    queued=set(lookaheads)
+    while queue:
+        i=queue.popleft()
+        queued.discard(i)
 
-            Y=i.split('->')[1].split('.')[1][0]
+        dot=i.index('.')
+        if dot==len(i)-1: continue
 
-            if i.index('.')+1<len(i)-1:
-                lastr=list(firstfollow.compute_first(i[i.index('.')+2])-set(chr(1013)))
-                
-            else:
-                lastr=i.lookahead
-            
-            for prod in production_list:
-                head, body=prod.split('->')
-                
-                if head!=Y: continue
-                
-                newitem=Item(Y+'->.'+body, lastr)
+        Y=i[dot+1]
+        if Y not in prods_by_head: continue
 
-                if not exists(newitem, items):
-                    items.append(newitem)
-                    flag=1
-        if flag==0: break
+        lastr=set()
+        for X in i[dot+2:]:
+            first=firstfollow.compute_first(X)
+            lastr|=first-set(chr(1013))
+            if chr(1013) not in first: break
+        else:
+            lastr|=lookaheads[i]
 
-    return items
+        for body in prods_by_head[Y]:
+            newitem=Y+'->.'+body
+            if newitem in lookaheads and lastr<=lookaheads[newitem]: continue
+
+            lookaheads.setdefault(newitem, set()).update(lastr)
+            if newitem not in queued:
+                queued.add(newitem)
+                queue.append(newitem)
+
+    return [Item(i, sorted(la)) for i, la in lookaheads.items()]
 
 def goto(items, symbol):
 
@@ -193,18 +202,26 @@ def main():
 
     global production_list, ntl, nt_list, tl, t_list    
 
+    # With arguments, compile a grammar file ahead of time into a standalone
+    # parser module instead of running interactively:
+    #   python clr.py grammar.txt -o parser.py [--method lr1|lalr1|slr1|lr0|auto] [--tokens]
+    if len(sys.argv) > 1:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'App', 'Backend'))
+        import codegen
+        return codegen.main(sys.argv[1:])
+
     firstfollow.main()
 
     print("\tFIRST AND FOLLOW OF NON-TERMINALS")
+    firstfollow.compute_first_follow()
     for nt in ntl:
-        firstfollow.compute_first(nt)
-        firstfollow.compute_follow(nt)
         print(nt)
         print("\tFirst:\t", firstfollow.get_first(nt))
         print("\tFollow:\t", firstfollow.get_follow(nt), "\n")  
     
 
     augment_grammar()
+    index_productions()
     nt_list=list(ntl.keys())
     t_list=list(tl.keys()) + ['$']
 
@@ -247,6 +264,7 @@ def main():
 
     print("Enter the string to be parsed")
     Input=input()+'$'
+    length=len(Input)
     try:
         stack=['0']
         a=list(table.items())
@@ -282,8 +300,11 @@ def main():
             elif(b[0][0]=="a"):
                 print("\n\tString Accepted\n")
                 break
-    except:
-        print('\n\tString INCORRECT for given Grammar!\n')
+    except (KeyError, IndexError, ValueError):
+        # No table entry for the next symbol: say where and what was expected
+        expected=[t for t in t_list if t in a[int(stack[-1])][1]]
+        print('\n\tString INCORRECT for given Grammar!')
+        print('\tError at position', length-len(Input), '- expected one of:', ' '.join(expected), '\n')
     return 
 
 if __name__=="__main__":
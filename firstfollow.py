@@ -1,4 +1,4 @@
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
 # Global variables
 t_list = OrderedDict()
@@ -30,63 +30,78 @@ class NonTerminal:
         self.follow |= set(symbols)
 
 
-# Compute FIRST set for a symbol
-def compute_first(symbol):
+# Compute FIRST and FOLLOW of every non-terminal with a worklist
+# that revisits a production only when a set it depends on has grown
+def compute_first_follow():
     global production_list, nt_list, t_list
-# if X is a terminal then first(X) = X
-    if symbol in t_list:
-        return set(symbol)
-
-    for prod in production_list:
-        head, body = prod.split('->')
 
-        if head != symbol:
-            continue
-# if X -> is a production, then first(X) = epsilon
-        if body == '':
-            nt_list[symbol].add_first('ϵ')
+    productions = [prod.split('->') for prod in production_list]
+    used_in = {nt: [] for nt in nt_list}
+    for p, (head, body) in enumerate(productions):
+        for symbol in body:
+            if symbol in used_in:
+                used_in[symbol].append(p)
+
+# if X -> Y1..Yk is a production, first(X) gets first(Yi) while Y1..Yi-1 derive epsilon
+    queue = deque(range(len(productions)))
+    queued = [True] * len(productions)
+    while queue:
+        p = queue.popleft()
+        queued[p] = False
+        head, body = productions[p]
+        size = len(nt_list[head].first)
+        nt_list[head].add_first(first_of_body(body))
+        if len(nt_list[head].first) == size:
             continue
+        for q in used_in[head]:
+            if not queued[q]:
+                queued[q] = True
+                queue.append(q)
 
-        for i, Y in enumerate(body):
-            if Y == symbol:
-                continue
-
-            t = compute_first(Y)
-            nt_list[symbol].add_first(t - {'ϵ'})
-
-            if 'ϵ' not in t:
-                break
-
-            if i == len(body) - 1:
-                nt_list[symbol].add_first('ϵ')
+# if A is the start symbol, follow(A) = $
+    nt_list[next(iter(nt_list))].add_follow('$')
 
+# if A -> aBb, follow(B) gets first(b); if b derives epsilon, follow(B) gets follow(A)
+    edges = {nt: set() for nt in nt_list}
+    for head, body in productions:
+        for i, B in enumerate(body):
+            if B not in nt_list:
+                continue
+            rest = first_of_body(body[i + 1:])
+            nt_list[B].add_follow(rest - {'ϵ'})
+            if 'ϵ' in rest and B != head:
+                edges[head].add(B)
+
+    queue = deque(nt_list)
+    while queue:
+        A = queue.popleft()
+        for B in edges[A]:
+            size = len(nt_list[B].follow)
+            nt_list[B].add_follow(nt_list[A].follow)
+            if len(nt_list[B].follow) != size and B not in queue:
+                queue.append(B)
+
+# FIRST of a string of grammar symbols
+def first_of_body(body):
+    result = set()
+    for Y in body:
+        t = get_first(Y)
+        result |= t - {'ϵ'}
+        if 'ϵ' not in t:
+            return result
+    result.add('ϵ')
+    return result
+
+# FIRST set for a symbol, valid once compute_first_follow has run
+def compute_first(symbol):
+    if symbol in t_list:
+        return set(symbol)
     return nt_list[symbol].first
 
 # Wrapper to get FIRST set
 def get_first(symbol):
     return compute_first(symbol)
 
-# Compute FOLLOW set
-def compute_follow(symbol):
-    global production_list, nt_list
-# if A is the start symbol, follow (A) = $
-    if symbol == list(nt_list.keys())[0]:
-        nt_list[symbol].add_follow('$')
-
-    for prod in production_list:
-        head, body = prod.split('->')
-
-        for i, B in enumerate(body):
-            if B != symbol:
-                continue
-
-            if i != len(body) - 1:
-                next_symbol = body[i + 1]
-                nt_list[symbol].add_follow(get_first(next_symbol) - {'ϵ'})
-
-            if i == len(body) - 1 or ('ϵ' in get_first(body[i + 1]) and B != head):
-                nt_list[symbol].add_follow(get_follow(head))
-
 # Wrapper to get FOLLOW set
 def get_follow(symbol):
     if symbol in t_list:
@@ -121,13 +136,8 @@ def main():
 
     
 # **************************Testing*******************************
-    # # Compute FIRST sets
-    # for nt in nt_list:
-    #     compute_first(nt)
-
-    # # Compute FOLLOW sets
-    # for nt in nt_list:
-    #     compute_follow(nt)
+    # # Compute FIRST and FOLLOW sets
+    # compute_first_follow()
 
     # # Display FIRST sets
     # print("\nFIRST sets:")